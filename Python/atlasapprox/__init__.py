@@ -12,6 +12,8 @@ from typing import Sequence, Union
 
 from atlasapprox.exceptions import BadRequestError
 from atlasapprox.utils import (
+    _get,
+    _decode,
     _fetch_organisms,
     _fetch_organs,
     _fetch_celltypes,
@@ -183,7 +185,7 @@ class API:
         a cell type, each row a feature. The unit of measurement, or
         normalisation, is counts per ten thousand (cptt).
         """
-        response = requests.get(
+        response = _get(
             baseurl + "average",
             params={
                 "organism": organism,
@@ -193,7 +195,7 @@ class API:
             },
         )
         if response.ok:
-            resjson = response.json()
+            resjson = _decode(response)
             celltypes = resjson["celltypes"]
             features = resjson["features"]
             matrix = pd.DataFrame(
@@ -202,7 +204,7 @@ class API:
                 columns=celltypes,
             )
             return matrix
-        raise BadRequestError(response.json()["message"])
+        raise BadRequestError(_decode(response)["message"])
 
     def fraction_detected(
         self,
@@ -223,7 +225,7 @@ class API:
             A pandas.DataFrame with the fraction expressing. Each column is
             a cell type, each row a feature.
         """
-        response = requests.get(
+        response = _get(
             baseurl + "fraction_detected",
             params={
                 "organism": organism,
@@ -233,7 +235,7 @@ class API:
             },
         )
         if response.ok:
-            resjson = response.json()
+            resjson = _decode(response)
             celltypes = resjson["celltypes"]
             features = resjson["features"]
             matrix = pd.DataFrame(
@@ -242,7 +244,7 @@ class API:
                 columns=celltypes,
             )
             return matrix
-        raise BadRequestError(response.json()["message"])
+        raise BadRequestError(_decode(response)["message"])
 
     def dotplot(
         self,
@@ -262,7 +264,7 @@ class API:
         Return: A pandas.DataFrame with the fraction expressing. Each column is
             a cell type, each row a feature.
         """
-        response = requests.get(
+        response = _get(
             baseurl + "dotplot",
             params={
                 "organism": organism,
@@ -272,7 +274,7 @@ class API:
             },
         )
         if response.ok:
-            resjson = response.json()
+            resjson = _decode(response)
             celltypes = resjson["celltypes"]
             features = resjson["features"]
             average = pd.DataFrame(
@@ -289,7 +291,7 @@ class API:
                 "average": average,
                 "fraction_detected": fraction,
             }
-        raise BadRequestError(response.json()["message"])
+        raise BadRequestError(_decode(response)["message"])
 
     def features(
         self,
@@ -385,14 +387,14 @@ class API:
         if (features is not None) and len(features):
             params["features"] = (",".join(features),)
 
-        response = requests.get(
+        response = _get(
             baseurl + "neighborhood",
             params=params,
         )
         if not response.ok:
-            raise BadRequestError(response.json()["message"])
+            raise BadRequestError(_decode(response)["message"])
 
-        resjson = response.json()
+        resjson = _decode(response)
         ncells = resjson["ncells"]
         celltypes = resjson["celltypes"]
         ncells = pd.DataFrame(
@@ -597,7 +599,7 @@ class API:
             organ and values corresponding to the average measurement (e.g.
             gene expression) for that feature in that cell type and organ.
         """
-        response = requests.get(
+        response = _get(
             baseurl + "highest_measurement",
             params={
                 "organism": organism,
@@ -607,9 +609,9 @@ class API:
             },
         )
         if not response.ok:
-            raise BadRequestError(response.json()["message"])
+            raise BadRequestError(_decode(response)["message"])
 
-        resp_result = response.json()
+        resp_result = _decode(response)
         result = pd.DataFrame(
             {
                 "celltype": resp_result["celltypes"],
@@ -644,7 +646,7 @@ class API:
         """
         features = list(features)
         features_negative = [] if features_negative is None else list(features_negative)
-        response = requests.get(
+        response = _get(
             baseurl + "highest_measurement_multiple",
             params={
                 "organism": organism,
@@ -655,9 +657,9 @@ class API:
             },
         )
         if not response.ok:
-            raise BadRequestError(response.json()["message"])
+            raise BadRequestError(_decode(response)["message"])
 
-        resp_result = response.json()
+        resp_result = _decode(response)
 
         # Score Series
         result = pd.DataFrame(
@@ -748,15 +750,15 @@ class API:
         if organs is not None:
             params["organs"] = organs
 
-        response = requests.get(
+        response = _get(
             baseurl + "celltypexorgan",
             params=params,
         )
         if not response.ok:
-            raise BadRequestError(response.json()["message"])
+            raise BadRequestError(_decode(response)["message"])
 
         dtype = bool if boolean else int
-        resp_result = response.json()
+        resp_result = _decode(response)
         result = pd.DataFrame(
             np.array(resp_result["detected"]).astype(dtype),
             columns=pd.Index(resp_result["organs"], name="organs"),
@@ -776,13 +778,15 @@ class API:
         Args:
             source_organism: The organism to query.
             features: The features (e.g. genes) to query.
-            target_organism: The organism to find homologs for.
+            target_organism: The organism to find homologs for. Use "all" to
+            search every other organism at once.
             max_distance_over_min: This is a threshold determining how far from
             the closest homolog to look for additional hits. Setting this to zero
             will return only the closest homolog. Values above about 50 are not
             useful as there is a hard cutoff at absolute distance 60.
 
-        Returns: A pandas.DataFrame with the homologs.
+        Returns: A pandas.DataFrame with the homologs. If target_organism is "all",
+        an additional "target_organisms" column indicates the organism of each homolog.
         """
 
         params = {
@@ -807,6 +811,8 @@ class API:
                 "distances": resp_result["distances"],
             }
         )
+        if "target_organisms" in resp_result:
+            result["target_organisms"] = resp_result["target_organisms"]
         return result
 
     def homology_distances(
@@ -832,14 +838,14 @@ class API:
             "target_organism": target_organism,
             "target_features": ",".join(target_features),
         }
-        response = requests.get(
+        response = _get(
             baseurl + "homology_distances",
             params=params,
         )
         if not response.ok:
-            raise BadRequestError(response.json()["message"])
+            raise BadRequestError(_decode(response)["message"])
 
-        resp_result = response.json()
+        resp_result = _decode(response)
         result = pd.DataFrame(
             {
                 "queries": resp_result["queries"],
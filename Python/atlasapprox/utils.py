@@ -1,8 +1,43 @@
 import requests
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 from atlasapprox.exceptions import BadRequestError
 
 
+# MessagePack extension type used by the API for numpy arrays
+ndarray_ext_code = 1
+
+
+def _decode_ndarray(code, data):
+    """Decode a numpy array from a MessagePack extension type, without copying."""
+    if code != ndarray_ext_code:
+        return msgpack.ExtType(code, data)
+    unpacker = msgpack.Unpacker()
+    unpacker.feed(data)
+    dtype, shape = unpacker.unpack()
+    return np.frombuffer(data, dtype=dtype, offset=unpacker.tell()).reshape(shape)
+
+
+def _get(url, params=None):
+    """Send a GET request, asking for MessagePack if available and JSON otherwise."""
+    headers = {}
+    if msgpack is not None:
+        headers["Accept"] = "application/msgpack, application/json;q=0.9"
+    return requests.get(url, params=params, headers=headers)
+
+
+def _decode(response):
+    """Decode the content of a response from the API, in JSON or MessagePack."""
+    if response.headers.get("Content-Type", "").startswith("application/msgpack"):
+        return msgpack.unpackb(response.content, ext_hook=_decode_ndarray)
+    return response.json()
+
+
 def _fetch_organisms(api, measurement_type: str):
     """Fetch organisms data"""
     response = requests.get(
@@ -0,0 +1,158 @@
+"""Compression of API responses negotiated from the Accept-Encoding header.
+
+Large JSON payloads (e.g. all features of a chromatin accessibility atlas) compress
+5-10 fold, so responses are compressed by the app itself rather than relying on a
+proxy in front of it. Streamed responses are compressed chunk by chunk as they are
+generated. Brotli and zstd are used if their packages are installed, gzip otherwise.
+"""
+import zlib
+
+from flask import request
+
+from config import configuration as config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+compression_config = config.get("compression", {})
+
+# Responses smaller than this many bytes are not worth compressing
+min_size = compression_config.get("min_size", 1024)
+
+# Only these media types are compressed. Other responses (e.g. approximation files)
+# are either already compressed or binary downloads that should be left alone
+mimetypes = compression_config.get("mimetypes", [
+    "application/json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "text/x-fasta",
+])
+
+
+class _GzipCompressor():
+    """Streaming gzip compressor."""
+    def __init__(self):
+        # wbits=31 means a gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+class _BrotliCompressor():
+    """Streaming brotli compressor."""
+    def __init__(self):
+        # The default quality (11) is too slow for dynamic content
+        self.compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+class _ZstdCompressor():
+    """Streaming zstd compressor."""
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+# Compressors by content coding, in order of preference when the client accepts several
+compressors = {}
+if zstandard is not None:
+    compressors["zstd"] = _ZstdCompressor
+if brotli is not None:
+    compressors["br"] = _BrotliCompressor
+compressors["gzip"] = _GzipCompressor
+
+
+def _compress_stream(chunks, compressor):
+    """Compress a stream of chunks as they come."""
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def negotiate_encoding(mimetype, size=None):
+    """Get the content coding to compress a response with, or None to leave it as is.
+
+    Args:
+        mimetype: The media type of the response.
+        size: The size of the uncompressed body in bytes, None if unknown (streamed).
+    """
+    if mimetype not in mimetypes:
+        return None
+    if (size is not None) and (size < min_size):
+        return None
+    return request.accept_encodings.best_match(list(compressors))
+
+
+def compress_data(data, encoding):
+    """Compress a whole body with a content coding."""
+    compressor = compressors[encoding]()
+    return compressor.compress(data) + compressor.flush()
+
+
+def set_encoding(response, encoding):
+    """Set the headers of a response whose body is compressed with a content coding."""
+    response.vary.add("Accept-Encoding")
+    response.headers["Content-Encoding"] = encoding
+    # The compressed representation is not byte-identical to the uncompressed one
+    etag, _ = response.get_etag()
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def compress_response(response):
+    """Compress a response if the client accepts it and it is worth it.
+
+    Cached responses are compressed (and their compressed bodies cached) by the response
+    cache itself, see api/v1/cache.py, so they come here with a Content-Encoding already.
+    """
+    if (response.status_code < 200) or (response.status_code in (204, 304)):
+        return response
+    if response.direct_passthrough or ("Content-Encoding" in response.headers):
+        return response
+    if response.mimetype not in mimetypes:
+        return response
+
+    # Whatever the outcome, the representation depends on this header
+    response.vary.add("Accept-Encoding")
+
+    if response.is_streamed:
+        encoding = negotiate_encoding(response.mimetype)
+        if encoding is None:
+            return response
+        response.response = _compress_stream(response.response, compressors[encoding]())
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        encoding = negotiate_encoding(response.mimetype, len(data))
+        if encoding is None:
+            return response
+        response.set_data(compress_data(data, encoding))
+
+    return set_encoding(response, encoding)
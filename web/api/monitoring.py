@@ -0,0 +1,63 @@
+"""Monitoring of API requests with Prometheus metrics.
+
+Flask hooks record the latency and errors of every request, and a view exposes all
+metrics (see metrics.py) in Prometheus text format. The view is only registered if
+enabled in the configuration and, if a token is set, only answers scrapers sending the
+header "Authorization: Bearer <token>".
+"""
+import hmac
+import time
+
+from flask import g, request, Response
+
+from config import configuration as config
+from metrics import (
+    get_metrics,
+    request_errors,
+    request_latency,
+)
+
+
+metrics_config = config.get("metrics", {})
+
+
+def start_request_timer():
+    """Remember when a request started (Flask before_request hook)."""
+    g.metrics_start = time.perf_counter()
+
+
+def observe_request(response):
+    """Record the latency and errors of a request (Flask after_request hook)."""
+    start = g.get("metrics_start", None)
+    if start is None:
+        return response
+
+    # Use the URL rule rather than the path, to keep the number of labels bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_latency.labels(endpoint, request.method).observe(time.perf_counter() - start)
+    if response.status_code >= 400:
+        request_errors.labels(endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+def _is_authorised():
+    """Check whether the current request may read metrics."""
+    token = metrics_config.get("token", "")
+    if not token:
+        return True
+    header = request.headers.get("Authorization", "")
+    return hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+
+
+def metrics_view():
+    """Flask view exposing all metrics to Prometheus."""
+    if not _is_authorised():
+        return Response(
+            "Unauthorised\n",
+            status=401,
+            headers={"WWW-Authenticate": "Bearer"},
+            mimetype="text/plain",
+        )
+    data, content_type = get_metrics()
+    return Response(data, content_type=content_type)
+
@@ -1,6 +1,7 @@
 """Main module for API v1"""
 
 from api.v1.endpoints import get_api_endpoint
+from api.v1.representations import representations
 from api.v1.objects import (
     MeasurementTypes,
     Organisms,
@@ -8,6 +9,7 @@ from api.v1.objects import (
     Celltypes,
     Dotplot,
     HasFeatures,
+    SearchFeatures,
     Features,
     FeatureSequences,
     Average,
@@ -24,16 +26,20 @@ from api.v1.objects import (
     CelltypeLocation,
     Neighborhood,
     InteractionPartners,
+    InteractionScores,
     Homologs,
     ApproximationFile,
+    ApproximationSubset,
     FullAtlasFiles,
     HomologyDistances,
+    Batch,
 )
 
 __all__ = ("api_dict",)
 
 api_dict = {
     "endpoint_handler": get_api_endpoint,
+    "representations": representations,
     "objects": {
         "measurement_types": MeasurementTypes,
         "organisms": Organisms,
@@ -41,6 +47,7 @@ api_dict = {
         "features": Features,
         "sequences": FeatureSequences,
         "has_features": HasFeatures,
+        "search_features": SearchFeatures,
         "celltypes": Celltypes,
         "average": Average,
         "fraction_detected": FractionDetected,
@@ -48,6 +55,7 @@ api_dict = {
         "neighborhood": Neighborhood,
         "markers": Markers,
         "interaction_partners": InteractionPartners,
+        "interaction_scores": InteractionScores,
         "homologs": Homologs,
         "highest_measurement": HighestMeasurement,
         "highest_measurement_multiple": HighestMeasurementMultiple,
@@ -59,7 +67,9 @@ api_dict = {
         "celltype_location": CelltypeLocation,
         "data_sources": DataSources,
         "approximation": ApproximationFile,
+        "approximation_subset": ApproximationSubset,
         "full_atlas_files": FullAtlasFiles,
         "homology_distances": HomologyDistances,
+        "batch": Batch,
     },
 }
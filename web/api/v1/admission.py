@@ -0,0 +1,279 @@
+"""Cost-based admission control of API requests.
+
+Some queries (e.g. similar features across all chromatin peaks of an organ) take
+seconds and can occupy every worker thread, starving cheap metadata requests. Each
+request is therefore given an estimated cost, from the number of features and of
+(organ, cell type) groups it reads and the number of measurements per feature and
+group, and runs in one of two lanes with separate concurrency limits: cheap and
+expensive. A request that cannot start within the configured wait, or finds its lane's
+queue full, is answered with 429 Too Many Requests and a Retry-After header.
+
+Limits are per worker process. Waiting requests hold a worker thread, so the
+concurrency plus queue length of the expensive lane should stay below the number of
+threads per worker (see gunicorn.conf.py).
+"""
+import math
+import threading
+import time
+
+from flask import request, Response
+from werkzeug.exceptions import TooManyRequests
+
+from config import configuration as config
+from models import (
+    get_atlas_sizes,
+    get_cached_export,
+    MeasurementTypeNotFoundError,
+    OrganismNotFoundError,
+)
+from api.v1.utils import (
+    clean_feature_string,
+    clean_organ_string,
+    clean_celltype_string,
+    get_list_parameter,
+)
+
+
+admission_config = config.get("admission", {})
+
+# Requests estimated to cost more than this go to the expensive lane. The unit is one
+# value read, e.g. one feature in one cell type of one organ. Markers of one cell type
+# among all genes of an organ (about 3 million) stay cheap, while markers of all cell
+# types at once or similar features among chromatin peaks do not
+cheap_max_cost = admission_config.get("cheap_max_cost", 5000000)
+
+# Maximal time in seconds a request waits for its turn before being turned away
+max_wait = admission_config.get("max_wait", 10)
+
+# How the work of each endpoint scales, as (features, groups, width):
+# - features: "query" for the features in the request, "all" for every feature
+# - groups: "organ" for the cell types of the requested organ (or of the whole organism
+#   if none is given), "organism" for all cell types of all organs
+# - width: number of measurements read per feature and group
+# Endpoints that are not listed (e.g. organisms, organs) count as one unit of work, except
+# approximation_subset (see _estimate_export_cost)
+endpoint_costs = {
+    "average": ("query", "organ", 1),
+    "fraction_detected": ("query", "organ", 1),
+    "dotplot": ("query", "organ", 2),
+    "neighborhood": ("query", "organ", 1),
+    "markers": ("all", "organ", 2),
+    "similar_features": ("all", "organ", 1),
+    "similar_celltypes": ("query", "organism", 1),
+    "highest_measurement": ("query", "organism", 1),
+    "highest_measurement_multiple": ("query", "organism", 2),
+    "interaction_scores": ("all", "organ", 1),
+}
+
+
+def _get_request_args():
+    """Get the parameters of a request, from its query string and, for POST, JSON body."""
+    args = request.args
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            args = {**args.to_dict(), **body}
+    return args
+
+
+def _get_query_features(args):
+    """Get the features of a request, either a comma-separated string or a list."""
+    features = args.get("features", args.get("feature", None))
+    if isinstance(features, list):
+        return features
+    if isinstance(features, str):
+        return clean_feature_string(features)
+    return []
+
+
+def _estimate_export_cost(args):
+    """Estimate the cost of exporting an approximation subset.
+
+    Subsets already exported are sent from disk and cost one unit. Otherwise, the
+    average and fraction of each kept feature are copied for each kept cell type.
+    """
+    organism = args["organism"]
+    measurement_types = get_list_parameter(args, "measurement_types")
+    organs = get_list_parameter(args, "organs", clean_organ_string)
+    celltypes = get_list_parameter(args, "celltypes", clean_celltype_string)
+    features = _get_query_features(args) or None
+
+    try:
+        export_path = get_cached_export(
+            organism,
+            measurement_types=measurement_types,
+            organs=organs,
+            celltypes=celltypes,
+            features=features,
+        )
+    except KeyError:
+        # Invalid subset, let the resource itself report the error
+        return 1
+    if export_path is not None:
+        return 1
+
+    if measurement_types is None:
+        measurement_types = config["feature_types"]
+    cost = 0
+    for measurement_type in measurement_types:
+        try:
+            sizes = get_atlas_sizes(organism, measurement_type=measurement_type)
+        except MeasurementTypeNotFoundError:
+            continue
+        nfeatures = sizes["nfeatures"] if features is None else len(features)
+        for organ, ngroups in sizes["ngroups"].items():
+            if (organs is not None) and (organ not in organs):
+                continue
+            if celltypes is not None:
+                ngroups = min(ngroups, len(celltypes))
+            cost += nfeatures * ngroups * 2
+    return max(cost, 1)
+
+
+def estimate_cost(endpoint, args):
+    """Estimate the cost of a request to an endpoint.
+
+    Args:
+        endpoint: The name of the endpoint, e.g. "average".
+        args: The request parameters, including those in the JSON body of POST requests.
+
+    Returns:
+        The estimated number of values read to answer the request.
+    """
+    # Requests without an organism fail before reading anything
+    if "organism" not in args:
+        return 1
+    if endpoint == "approximation_subset":
+        return _estimate_export_cost(args)
+    if endpoint not in endpoint_costs:
+        return 1
+
+    features_scope, groups_scope, width = endpoint_costs[endpoint]
+    organism = args["organism"]
+    measurement_type = args.get("measurement_type", "gene_expression")
+    organ = args.get("organ", None)
+    organ = clean_organ_string(organ) if isinstance(organ, str) else None
+    if groups_scope == "organism":
+        organ = None
+
+    try:
+        # Only dataset shapes are read, so this is cheap even when caches are cold
+        sizes = get_atlas_sizes(organism, measurement_type=measurement_type)
+    except (OrganismNotFoundError, MeasurementTypeNotFoundError, KeyError, TypeError):
+        # Let the resource itself report the error, including malformed JSON bodies
+        return 1
+
+    if features_scope == "all":
+        nfeatures = sizes["nfeatures"]
+    else:
+        nfeatures = len(_get_query_features(args))
+    if (organ is None) or (organ == "all"):
+        ngroups = sum(sizes["ngroups"].values())
+    else:
+        ngroups = sizes["ngroups"].get(organ, 0)
+
+    # Markers of all cell types (or organs) at once repeat the work for each of them
+    if (endpoint == "markers") and ("all" in (args.get("celltype"), args.get("organ"))):
+        width *= max(ngroups, 1)
+
+    return max(nfeatures * ngroups * width, 1)
+
+
+class Lane():
+    """Bounded pool of slots for requests of a similar cost, with a bounded queue."""
+    def __init__(self, name, concurrency, max_queue):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.nwaiting = 0
+        # Moving average of the time requests spend in a slot, for Retry-After
+        self.mean_duration = 1.0
+
+    def get_retry_after(self):
+        """Get the number of seconds after which a turned away request may retry."""
+        with self.lock:
+            backlog = self.nwaiting + self.concurrency
+            return max(1, math.ceil(self.mean_duration * backlog / self.concurrency))
+
+    def acquire(self, timeout):
+        """Take a slot, waiting up to timeout seconds. Returns whether it succeeded."""
+        with self.lock:
+            if self.nwaiting >= self.max_queue:
+                return False
+            self.nwaiting += 1
+        try:
+            return self.slots.acquire(timeout=timeout)
+        finally:
+            with self.lock:
+                self.nwaiting -= 1
+
+    def release(self, duration):
+        """Give a slot back, recording how long it was held."""
+        with self.lock:
+            self.mean_duration = 0.8 * self.mean_duration + 0.2 * duration
+        self.slots.release()
+
+
+lanes = {
+    name: Lane(
+        name,
+        concurrency=admission_config.get(name, {}).get("concurrency", default_concurrency),
+        max_queue=admission_config.get(name, {}).get("max_queue", default_max_queue),
+    )
+    for name, default_concurrency, default_max_queue in (
+        ("cheap", 4, 16),
+        ("expensive", 1, 2),
+    )
+}
+
+
+def admission_control(func):
+    """Decorator that runs a resource method in the lane matching its estimated cost.
+
+    Resources opt in by decorating their methods with this one, after the response
+    cache (so cache hits and coalesced requests are never queued) and before dealing
+    with model exceptions.
+    """
+
+    def inner(*args_inner, **kwargs_inner):
+        endpoint = request.path.rstrip("/").split("/")[-1]
+        cost = estimate_cost(endpoint, _get_request_args())
+        lane = lanes["cheap" if cost <= cheap_max_cost else "expensive"]
+
+        if not lane.acquire(max_wait):
+            retry_after = lane.get_retry_after()
+            exc = TooManyRequests(retry_after=retry_after)
+            exc.data = {
+                "message": "Too many requests, please retry later.",
+                "error": {
+                    "type": "too_many_requests",
+                    "lane": lane.name,
+                    "retry_after": retry_after,
+                },
+            }
+            raise exc
+
+        t0 = time.perf_counter()
+
+        def release():
+            lane.release(time.perf_counter() - t0)
+
+        try:
+            result = func(*args_inner, **kwargs_inner)
+        except BaseException:
+            release()
+            raise
+
+        # Streamed responses keep working until the stream is closed. Files (e.g. from
+        # send_file) are passed through to the server, which never closes the response
+        # itself, and take no work to send anyway
+        streamed = isinstance(result, Response) and result.is_streamed
+        if streamed and not result.direct_passthrough:
+            result.call_on_close(release)
+        else:
+            release()
+        return result
+
+    return inner
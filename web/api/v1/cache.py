@@ -0,0 +1,241 @@
+"""Response cache for API resources.
+
+Responses are stored as serialised JSON and keyed by the endpoint, the normalised query
+parameters, and the content hash of the atlas (or atlases) they were computed from, so
+a cached response never outlives the data behind it. The least recently used responses
+are evicted once the total size exceeds the configured number of bytes.
+
+The same key is used to validate responses with HTTP clients and proxies: it is hashed
+into an ETag, so a request carrying a matching If-None-Match header gets an empty 304
+response, without any computation if the response is cached. ETags are compared weakly,
+because compressed responses carry a weak version of the same ETag. A 304 has the same
+ETag and Vary headers as the 200 it stands for, so it depends on the size of the body
+(only large ones are compressed) too.
+
+On a miss, identical concurrent requests are coalesced (see singleflight.py), so a burst
+of the same expensive query is computed only once.
+
+Compressing multi-megabyte bodies costs more than looking them up, so the compressed
+body for each content coding accepted by clients is cached next to the uncompressed one.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+
+from flask import g, request, Response
+
+from config import configuration as config
+from metrics import response_cache_lookups
+from api.compression import (
+    mimetypes as compressible_mimetypes,
+    negotiate_encoding,
+    compress_data,
+    set_encoding,
+)
+from models import (
+    get_atlas_hash,
+    get_atlases_hash,
+    OrganismNotFoundError,
+)
+from api.v1.singleflight import singleflight
+from api.v1.representations import (
+    encoders,
+    get_mediatype,
+)
+from api.v1.utils import (
+    clean_feature_string,
+    clean_organ_string,
+    clean_celltype_string,
+)
+
+
+class ResponseCache():
+    """Byte-bounded LRU cache of serialised responses."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, record=True):
+        """Get a cached response body, or None if missing.
+
+        Args:
+            record: Whether to count the lookup in the hit and miss statistics.
+        """
+        with self.lock:
+            body = self.entries.get(key, None)
+            if body is not None:
+                self.entries.move_to_end(key)
+            if record:
+                result = "miss" if body is None else "hit"
+                if body is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                response_cache_lookups.labels(result).inc()
+            return body
+
+    def set(self, key, body):
+        """Store a response body, evicting the least recently used ones if needed."""
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= len(self.entries.pop(key))
+            self.entries[key] = body
+            self.nbytes += len(body)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def clear(self):
+        """Remove all cached responses."""
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Get cache statistics."""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+response_cache = ResponseCache(
+    config.get("response_cache", {}).get("max_bytes", 256 * 1024 * 1024),
+)
+
+
+def get_normalised_query(args):
+    """Normalise query parameters so that equivalent requests share a cache entry."""
+    normalised = {}
+    for key, value in args.items():
+        if key == "features":
+            value = ",".join(clean_feature_string(value))
+        elif key == "organ":
+            value = clean_organ_string(value)
+        elif key == "celltype":
+            value = clean_celltype_string(value)
+        normalised[key] = value
+    return tuple(sorted(normalised.items()))
+
+
+def get_atlas_version(args):
+    """Get the content hash of the data a request depends on.
+
+    Requests about one organism depend on its atlas only, all others on every atlas.
+    """
+    organism = args.get("organism", None)
+    if organism is None:
+        return get_atlases_hash()
+    return get_atlas_hash(organism)
+
+
+def get_cache_key(args, mediatype):
+    """Get the cache key of the current request, or None if it cannot be cached."""
+    try:
+        version = get_atlas_version(args)
+    except OrganismNotFoundError:
+        # Let the resource itself report the error
+        return None
+    return (request.path, get_normalised_query(args), mediatype, version)
+
+
+def get_etag(key):
+    """Get the ETag of a cache key."""
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def get_max_age(path):
+    """Get the Cache-Control lifetime in seconds for an endpoint, from the configuration."""
+    lifetimes = config.get("cache_control", {})
+    endpoint = path.rstrip("/").split("/")[-1]
+    return lifetimes.get(endpoint, lifetimes.get("default", 0))
+
+
+def set_validators(response, etag):
+    """Set the ETag and Cache-Control headers of a response."""
+    response.set_etag(etag)
+    response.vary.add("Accept")
+    response.cache_control.public = True
+    response.cache_control.max_age = get_max_age(request.path)
+    return response
+
+
+def cached_response(func):
+    """Decorator that caches the JSON responses of a resource.
+
+    Resources opt in by decorating their get method with this one, after checking
+    required parameters and before dealing with model exceptions, so errors are never
+    cached.
+    """
+
+    def inner(*args_inner, **kwargs_inner):
+        # Profiled requests should measure the actual work, not a cache lookup
+        if g.get("profiler", None) is not None:
+            return func(*args_inner, **kwargs_inner)
+
+        mediatype = get_mediatype(request)
+        key = get_cache_key(request.args, mediatype)
+        if key is None:
+            return func(*args_inner, **kwargs_inner)
+
+        etag = get_etag(key)
+        not_modified = request.if_none_match.contains_weak(etag)
+
+        body = response_cache.get(key)
+        status = "HIT"
+        if body is None:
+            def compute():
+                result = func(*args_inner, **kwargs_inner)
+                # Only plain payloads are cached, streamed or custom responses pass through
+                if not isinstance(result, dict):
+                    return None, result
+                body = encoders[mediatype](result)
+                response_cache.set(key, body)
+                return body, None
+
+            body, result, shared = singleflight.run(etag, compute)
+            if body is None:
+                return result
+            if shared:
+                # Possibly computed by another worker process
+                response_cache.set(key, body)
+                status = "COALESCED"
+            else:
+                status = "MISS"
+
+        encoding = negotiate_encoding(mediatype, len(body))
+        if not_modified:
+            response = Response(status=304)
+        elif encoding is None:
+            response = Response(body, mimetype=mediatype)
+        else:
+            key_encoded = key + (encoding,)
+            body_encoded = response_cache.get(key_encoded, record=False)
+            if body_encoded is None:
+                body_encoded = compress_data(body, encoding)
+                response_cache.set(key_encoded, body_encoded)
+            response = Response(body_encoded, mimetype=mediatype)
+        response.headers["X-Cache"] = status
+        set_validators(response, etag)
+        if not_modified:
+            # Same headers as the 200, where Vary is set by compress_response (which
+            # leaves 304 responses alone), but no body to decode
+            if mediatype in compressible_mimetypes:
+                response.vary.add("Accept-Encoding")
+            if encoding is not None:
+                response.set_etag(etag, weak=True)
+        elif encoding is not None:
+            set_encoding(response, encoding)
+        return response
+
+    return inner
@@ -13,6 +13,7 @@ from models import (
     TooManyFeaturesError,
     FeaturesNotPairedError,
     NeighborhoodNotFoundError,
+    RegionFormatError,
 )
 
 
@@ -103,6 +104,16 @@ def model_exceptions(func):
                     "invalid_value": exc.features,
                 },
             )
+        except RegionFormatError as exc:
+            abort(
+                400,
+                message=f"Region not understood, use chromosome:start-end with start <= end: {exc.region}.",
+                error={
+                    "type": "invalid_parameter",
+                    "invalid_parameter": "region",
+                    "invalid_value": exc.region,
+                },
+            )
         except TooManyFeaturesError as exc:
             abort(
                 400,
@@ -2,6 +2,7 @@ from api.v1.objects.measurement_types import MeasurementTypes
 from api.v1.objects.organisms import Organisms
 from api.v1.objects.organs import Organs
 from api.v1.objects.check_features import HasFeatures
+from api.v1.objects.search_features import SearchFeatures
 from api.v1.objects.features import Features
 from api.v1.objects.feature_sequences import FeatureSequences
 from api.v1.objects.celltypes import Celltypes
@@ -20,10 +21,13 @@ from api.v1.objects.celltype_location import CelltypeLocation
 from api.v1.objects.neighborhood import Neighborhood
 from api.v1.objects.dotplot import Dotplot
 from api.v1.objects.interaction_partners import InteractionPartners
+from api.v1.objects.interaction_scores import InteractionScores
 from api.v1.objects.homologs import Homologs
 from api.v1.objects.approximation_file import ApproximationFile
+from api.v1.objects.approximation_subset import ApproximationSubset
 from api.v1.objects.full_atlas_files import FullAtlasFiles
 from api.v1.objects.homology_distances import HomologyDistances
+from api.v1.objects.batch import Batch
 
 
 __all__ = (
@@ -33,6 +37,7 @@ __all__ = (
     "Celltypes",
     "Dotplot",
     "HasFeatures",
+    "SearchFeatures",
     "Features",
     "FeatureSequences",
     "Average",
@@ -49,8 +54,11 @@ __all__ = (
     "DataSources",
     "CelltypeLocation",
     "InteractionPartners",
+    "InteractionScores",
     "Homologs",
     "ApproximationFile",
+    "ApproximationSubset",
     "FullAtlasFiles",
     "HomologyDistances",
+    "Batch",
 )
@@ -9,7 +9,13 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
-from models import get_atlas_path
+from api.v1.cache import get_max_age
+from models import (
+    get_atlas_hash,
+    get_atlas_path,
+    get_precompressed_atlas_hash,
+    get_precompressed_atlas_paths,
+)
 
 
 class ApproximationFile(Resource):
@@ -18,11 +24,35 @@ class ApproximationFile(Resource):
     @required_parameters("organism")
     @model_exceptions
     def get(self):
-        """Get a whole approximation."""
+        """Get a whole approximation.
+
+        Downloads can be resumed with Range (and If-Range) requests. The ETag is the
+        content hash of the file sent, so it only changes when that file does. If the
+        client accepts it and a precompressed copy of the atlas exists, that is sent
+        instead.
+        """
         args = request.args
         organism = args.get("organism")
 
-        return send_file(
-            get_atlas_path(organism),
+        approx_path = get_atlas_path(organism)
+        etag = get_atlas_hash(organism)
+
+        precompressed_paths = get_precompressed_atlas_paths(organism)
+        encoding = request.accept_encodings.best_match(list(precompressed_paths))
+        if encoding is not None:
+            approx_path = precompressed_paths[encoding]
+            # Each representation needs its own strong ETag, which only matches ranges
+            # of the very same bytes (e.g. not of a copy compressed again differently)
+            etag = get_precompressed_atlas_hash(organism, encoding)
+
+        response = send_file(
+            approx_path,
             download_name=f"{organism}.h5",
+            etag=etag,
+            max_age=get_max_age(request.path),
+            conditional=True,
         )
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
@@ -0,0 +1,52 @@
+# Web imports
+from flask import (
+    request,
+    send_file,
+)
+from flask_restful import Resource
+
+from api.v1.admission import admission_control
+from api.v1.exceptions import (
+    required_parameters,
+    model_exceptions,
+)
+from api.v1.cache import get_max_age
+from api.v1.utils import (
+    clean_feature_string,
+    clean_organ_string,
+    clean_celltype_string,
+    get_list_parameter,
+)
+from models import export_subset
+
+
+class ApproximationSubset(Resource):
+    """Get a subset of an approximation as a file in the same format."""
+
+    @required_parameters("organism")
+    @admission_control
+    @model_exceptions
+    def get(self):
+        """Get an approximation with only some organs, cell types, and features."""
+        args = request.args
+        organism = args.get("organism")
+        features = args.get("features", None)
+        if features is not None:
+            features = clean_feature_string(features)
+
+        export_path, subset_hash = export_subset(
+            organism,
+            measurement_types=get_list_parameter(args, "measurement_types"),
+            organs=get_list_parameter(args, "organs", clean_organ_string),
+            celltypes=get_list_parameter(args, "celltypes", clean_celltype_string),
+            features=features,
+        )
+
+        return send_file(
+            export_path,
+            mimetype="application/x-hdf5",
+            download_name=f"{organism}_subset.h5",
+            etag=subset_hash,
+            max_age=get_max_age(request.path),
+            conditional=True,
+        )
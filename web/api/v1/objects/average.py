@@ -8,6 +8,7 @@ from models import (
     get_averages,
     get_celltypes,
     get_celltype_location,
+    get_celltype_organism_index,
     get_feature_index,
     get_feature_names,
 )
@@ -16,8 +17,11 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
+from api.v1.streaming import stream_measurement
 from api.v1.utils import (
-    clean_feature_string,
+    get_features_or_region,
     clean_organ_string,
     clean_celltype_string,
 )
@@ -26,15 +30,18 @@ from api.v1.utils import (
 class Average(Resource):
     """Get average measurement by cell type"""
 
-    @required_parameters('organism', 'features')
+    @required_parameters('organism')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
         args = request.args
         measurement_type = args.get("measurement_type", "gene_expression")
         organism = args.get("organism")
-        features = args.get("features")
-        features = clean_feature_string(features, organism, measurement_type)
+        features = args.get("features", None)
+        region = args.get("region", None)
+        features = get_features_or_region(features, region, organism, measurement_type)
         unit = config['units'][measurement_type]
 
         organ = args.get("organ", None)
@@ -67,6 +74,11 @@ class Average(Resource):
             ))
         else:
             cell_type = clean_celltype_string(cell_type)
+            cell_type = get_celltype_organism_index(
+                organism,
+                cell_type,
+                measurement_type=measurement_type,
+            )["celltype"]
             avgs = get_averages(
                 organism=organism,
                 cell_type=cell_type,
@@ -94,9 +106,11 @@ class Average(Resource):
             "organism": organism,
             "measurement_type": measurement_type,
             "features": features_corrected,
-            "average": avgs.tolist(),
+            "average": avgs,
             "unit": unit,
         }
+        if region is not None:
+            result["region"] = region
         if organ is not None:
             result.update({
                 "organ": organ,
@@ -109,3 +123,8 @@ class Average(Resource):
             })
         return result
 
+    @admission_control
+    @model_exceptions
+    def post(self):
+        """Stream average measurements for any number of features as NDJSON"""
+        return stream_measurement(["average"])
@@ -0,0 +1,135 @@
+# Web imports
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from flask import (
+    current_app,
+    request,
+    Response,
+)
+from flask_restful import Resource, abort
+from werkzeug.exceptions import HTTPException
+
+# Helper functions
+from config import configuration as config
+from api.v1.endpoints import get_api_endpoint
+
+
+batch_config = config.get("batch", {})
+
+# Maximal number of sub-queries in one batch
+max_queries = batch_config.get("max_queries", 100)
+
+# Number of organisms processed in parallel
+max_workers = batch_config.get("max_workers", 4)
+
+# Endpoints that cannot be part of a batch, because they do not return JSON
+excluded_endpoints = ("batch", "approximation", "approximation_subset")
+
+
+def _run_query(app, resource_cls, endpoint, params):
+    """Run a single sub-query against a resource, as if it were a GET request."""
+    with app.test_request_context(get_api_endpoint(endpoint), query_string=params):
+        try:
+            result = resource_cls().get()
+        except HTTPException as exc:
+            error = getattr(exc, "data", None)
+            if error is None:
+                error = {"message": exc.description}
+            return {"status": exc.code, **error}
+        except Exception:
+            # One failing query should not take the whole batch down
+            current_app.logger.exception("Batch query failed: %s %s", endpoint, params)
+            return {"status": 500, "message": "Internal server error."}
+
+    # Cached resources return an encoded JSON response
+    if isinstance(result, Response):
+        if result.mimetype != "application/json":
+            return {
+                "status": 400,
+                "message": f"Endpoint cannot be batched with these parameters: {endpoint}.",
+            }
+        result = json.loads(result.get_data())
+
+    return {"status": 200, "result": result}
+
+
+def _run_queries(app, queries):
+    """Run a list of (index, resource, endpoint, params) sub-queries in order."""
+    return [
+        (idx, _run_query(app, resource_cls, endpoint, params))
+        for idx, resource_cls, endpoint, params in queries
+    ]
+
+
+class Batch(Resource):
+    """Run many queries against other endpoints in a single request"""
+
+    def post(self):
+        """Run a list of sub-queries and return their results in order"""
+        from api.v1 import api_dict
+
+        body = request.get_json(silent=True)
+        if (not isinstance(body, dict)) or (not isinstance(body.get("queries", None), list)):
+            abort(
+                400,
+                message='The request body should be a JSON object with a "queries" list.',
+                error={
+                    "type": "missing_parameter",
+                    "missing_parameter": "queries",
+                },
+            )
+        queries = body["queries"]
+        if len(queries) > max_queries:
+            abort(
+                400,
+                message=f"Max number of queries is {max_queries}, requested: {len(queries)}.",
+            )
+
+        # Validate all queries first, then group them by organism: each group reuses
+        # the caches of one atlas and groups run in parallel
+        results = [None for query in queries]
+        groups = {}
+        for idx, query in enumerate(queries):
+            if not isinstance(query, dict):
+                results[idx] = {
+                    "status": 400,
+                    "message": 'Each query should be a JSON object with an "endpoint" key.',
+                }
+                continue
+            endpoint = query.get("endpoint", None)
+            params = query.get("params", {})
+            resource_cls = api_dict["objects"].get(endpoint, None)
+            if (resource_cls is None) or (endpoint in excluded_endpoints):
+                results[idx] = {
+                    "status": 400,
+                    "message": f"Endpoint not found or not allowed in a batch: {endpoint}.",
+                }
+                continue
+            if not isinstance(params, dict):
+                results[idx] = {
+                    "status": 400,
+                    "message": 'The "params" of a query should be a JSON object.',
+                }
+                continue
+            # Lists (e.g. features) are accepted as well as comma-separated strings
+            params = {
+                key: ",".join(str(x) for x in value) if isinstance(value, list) else value
+                for key, value in params.items()
+            }
+            groups.setdefault(params.get("organism", None), []).append(
+                (idx, resource_cls, endpoint, params)
+            )
+
+        app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_run_queries, app, group) for group in groups.values()
+            ]
+            for future in futures:
+                for idx, result in future.result():
+                    results[idx] = result
+
+        return {
+            "results": results,
+        }
@@ -10,6 +10,7 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_celltype_string,
 )
@@ -19,6 +20,7 @@ class CelltypeLocation(Resource):
     """Get list of cell types for an organ and organism"""
 
     @required_parameters('organism', 'celltype')
+    @cached_response
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
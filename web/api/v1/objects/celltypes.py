@@ -12,6 +12,7 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_organ_string,
 )
@@ -21,6 +22,7 @@ class Celltypes(Resource):
     """Get list of cell types for an organ and organism"""
 
     @required_parameters("organism", "organ")
+    @cached_response
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
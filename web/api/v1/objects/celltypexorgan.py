@@ -13,12 +13,14 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions
 )
+from api.v1.cache import cached_response
 
 
 class CelltypeXOrgan(Resource):
     """Get list of cell types for an organ and organism"""
 
     @required_parameters('organism')
+    @cached_response
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
@@ -42,7 +44,7 @@ class CelltypeXOrgan(Resource):
 
         organs = list(celltypexorgan.columns)
         celltypes = list(celltypexorgan.index)
-        detected = celltypexorgan.values.tolist()
+        detected = celltypexorgan.values
 
         return {
             "organism": organism,
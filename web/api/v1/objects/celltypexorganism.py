@@ -7,11 +7,13 @@ from models import (
     get_celltypexorganism,
 )
 from api.v1.exceptions import model_exceptions
+from api.v1.cache import cached_response
 
 
 class CelltypeXOrganism(Resource):
     """Get list of organs x organism for a cell type"""
 
+    @cached_response
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
@@ -24,7 +26,7 @@ class CelltypeXOrganism(Resource):
 
         organisms = list(celltypexorganism.columns)
         celltypes = list(celltypexorganism.index)
-        detected = celltypexorganism.values.tolist()
+        detected = celltypexorganism.values
 
         return {
             "celltypes": celltypes,
@@ -9,6 +9,7 @@ from models import (
     get_fraction_detected,
     get_celltypes,
     get_celltype_location,
+    get_celltype_organism_index,
     get_feature_index,
     get_feature_names,
     OrganismNotFoundError,
@@ -23,8 +24,11 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
+from api.v1.streaming import stream_measurement
 from api.v1.utils import (
-    clean_feature_string,
+    get_features_or_region,
     clean_organ_string,
     clean_celltype_string,
 )
@@ -33,15 +37,18 @@ from api.v1.utils import (
 class Dotplot(Resource):
     """Get average measurement and fraction detected by cell type"""
 
-    @required_parameters('organism', 'features')
+    @required_parameters('organism')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
         args = request.args
         measurement_type = args.get("measurement_type", "gene_expression")
         organism = args.get("organism")
-        features = args.get("features")
-        features = clean_feature_string(features, organism, measurement_type)
+        features = args.get("features", None)
+        region = args.get("region", None)
+        features = get_features_or_region(features, region, organism, measurement_type)
         unit = config['units'][measurement_type]
 
         organ = args.get("organ", None)
@@ -80,6 +87,11 @@ class Dotplot(Resource):
             ))
         else:
             cell_type = clean_celltype_string(cell_type)
+            cell_type = get_celltype_organism_index(
+                organism,
+                cell_type,
+                measurement_type=measurement_type,
+            )["celltype"]
             avgs = get_averages(
                 organism=organism,
                 cell_type=cell_type,
@@ -111,10 +123,12 @@ class Dotplot(Resource):
             "organism": organism,
             "measurement_type": measurement_type,
             "features": features_corrected,
-            "average": avgs.tolist(),
-            "fraction_detected": fracs.tolist(),
+            "average": avgs,
+            "fraction_detected": fracs,
             "unit": unit,
         }
+        if region is not None:
+            result["region"] = region
         if organ is not None:
             result.update({
                 "organ": organ,
@@ -127,4 +141,8 @@ class Dotplot(Resource):
             })
         return result
 
-
+    @admission_control
+    @model_exceptions
+    def post(self):
+        """Stream average measurements and fractions detected for any number of features as NDJSON"""
+        return stream_measurement(["average", "fraction"])
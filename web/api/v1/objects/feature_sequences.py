@@ -1,13 +1,18 @@
 # Web imports
-from flask import request
+import json
+from flask import (
+    request,
+    Response,
+)
 from flask_restful import Resource, abort
 
 # Helper functions
 from models import (
-    get_features,
     get_feature_index,
     get_feature_names,
     get_feature_sequences,
+    iter_feature_sequences,
+    FeatureNotFoundError,
 )
 from api.v1.exceptions import (
     required_parameters,
@@ -30,25 +35,44 @@ class FeatureSequences(Resource):
         organism = args.get("organism")
         features = args.get("features")
         features = clean_feature_string(features, organism, measurement_type)
-
-        features_lowercase = get_features(
-            organism=organism,
-            measurement_type=measurement_type,
-        )
+        output_format = args.get("format", "json")
+        if output_format not in ("json", "fasta", "ndjson"):
+            abort(
+                400,
+                message='The "format" parameter should be "json", "fasta", or "ndjson".',
+            )
 
         features_corrected = []
-        sequences = []
         features_all = get_feature_names(
             organism=organism,
             measurement_type=measurement_type,
         )
         for fea in features:
-            if fea.lower() not in features_lowercase:
+            try:
+                idx = get_feature_index(organism, fea.lower(), measurement_type=measurement_type)
+            except FeatureNotFoundError:
                 features_corrected.append(fea)
             else:
-                idx = get_feature_index(organism, fea.lower(), measurement_type=measurement_type)
                 features_corrected.append(features_all[idx])
 
+        # Stream sequences block by block instead of building a single JSON document
+        if output_format != "json":
+            sequence_type, sequences = iter_feature_sequences(
+                organism,
+                features_corrected,
+                measurement_type=measurement_type,
+            )
+            if output_format == "fasta":
+                lines = (f">{fea}\n{seq}\n" for fea, seq in sequences)
+                mimetype = "text/x-fasta"
+            else:
+                lines = (
+                    json.dumps({"feature": fea, "sequence": seq, "type": sequence_type}) + "\n"
+                    for fea, seq in sequences
+                )
+                mimetype = "application/x-ndjson"
+            return Response(lines, mimetype=mimetype)
+
         features, sequences, sequence_type = get_feature_sequences(
             organism,
             features_corrected,
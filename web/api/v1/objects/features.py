@@ -10,26 +10,61 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions
 )
+from api.v1.cache import cached_response
+from api.v1.streaming import stream_features
+
+
+def _get_integer(args, name, default, minimum):
+    """Get an integer query parameter, aborting if it is invalid or below a minimum."""
+    value = args.get(name, None)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        abort(400, message=f'The "{name}" parameter should be an integer.')
+    if value < minimum:
+        abort(400, message=f'The "{name}" parameter should be at least {minimum}.')
+    return value
 
 
 class Features(Resource):
     """Get list of features for an organism"""
 
     @required_parameters('organism')
+    @cached_response
     @model_exceptions
     def get(self):
-        """Get list of features (genes)"""
+        """Get list of features (genes), optionally a page at a time or streamed"""
         args = request.args
         measurement_type = args.get("measurement_type", "gene_expression")
         organism = args.get("organism")
+        offset = _get_integer(args, "offset", 0, minimum=0)
+        limit = _get_integer(args, "limit", None, minimum=1)
+        stream = str(args.get("stream", 'false')).lower() != 'false'
 
-        features = get_feature_names(
+        # This is the cached feature table, slices of it are views and not copies
+        features_all = get_feature_names(
             organism=organism,
             measurement_type=measurement_type,
         )
+        total = len(features_all)
+        stop = total if limit is None else min(offset + limit, total)
+        features = features_all[offset:stop]
 
-        return {
+        result = {
             "measurement_type": measurement_type,
             "organism": organism,
-            "features": list(features),
         }
+        if ("offset" in args) or ("limit" in args):
+            result.update({
+                "total": total,
+                "offset": offset,
+                "next_offset": stop if stop < total else None,
+            })
+
+        if stream:
+            return stream_features(result, features)
+
+        result["features"] = features.tolist()
+        return result
@@ -7,6 +7,7 @@ from models import (
     get_fraction_detected,
     get_celltypes,
     get_celltype_location,
+    get_celltype_organism_index,
     get_feature_index,
     get_feature_names,
 )
@@ -15,8 +16,11 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
+from api.v1.streaming import stream_measurement
 from api.v1.utils import (
-    clean_feature_string,
+    get_features_or_region,
     clean_organ_string,
     clean_celltype_string,
 )
@@ -25,18 +29,18 @@ from api.v1.utils import (
 class FractionDetected(Resource):
     """Get fraction of detected measurements"""
 
-    @required_parameters('organism', 'features')
+    @required_parameters('organism')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
         args = request.args
         measurement_type = args.get("measurement_type", "gene_expression")
         organism = args.get("organism")
-        features = args.get("features")
-        try:
-            features = clean_feature_string(features, organism)
-        except FeatureStringFormatError:
-            abort(400, message=f"Feature string not recognised: {features}.")
+        features = args.get("features", None)
+        region = args.get("region", None)
+        features = get_features_or_region(features, region, organism, measurement_type)
 
         organ = args.get("organ", None)
         cell_type = args.get("celltype", None)
@@ -60,6 +64,11 @@ class FractionDetected(Resource):
             ))
         else:
             cell_type = clean_celltype_string(cell_type)
+            cell_type = get_celltype_organism_index(
+                organism,
+                cell_type,
+                measurement_type=measurement_type,
+            )["celltype"]
             avgs = get_fraction_detected(
                 organism=organism,
                 cell_type=cell_type,
@@ -85,8 +94,10 @@ class FractionDetected(Resource):
             "organism": organism,
             "measurement_type": measurement_type,
             "features": features_corrected,
-            "fraction_detected": avgs.tolist(),
+            "fraction_detected": avgs,
         }
+        if region is not None:
+            result["region"] = region
         if organ is not None:
             result.update({
                 "organ": organ,
@@ -98,3 +109,9 @@ class FractionDetected(Resource):
                 "celltype": cell_type,
             })
         return result
+
+    @admission_control
+    @model_exceptions
+    def post(self):
+        """Stream fractions detected for any number of features as NDJSON"""
+        return stream_measurement(["fraction"])
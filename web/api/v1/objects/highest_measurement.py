@@ -13,12 +13,16 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
 
 
 class HighestMeasurement(Resource):
     """Get measurement in highest cell types"""
 
     @required_parameters('organism', 'feature', 'number')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get expression in highest cell types, in one organism"""
@@ -59,7 +63,7 @@ class HighestMeasurement(Resource):
             "feature": feature_corrected,
             "organs": result["organs"],
             "celltypes": result["celltypes"],
-            "average": result["average"].tolist(),
-            "fraction_detected": result["fraction_detected"].tolist(),
+            "average": result["average"],
+            "fraction_detected": result["fraction_detected"],
             "unit": unit,
         }
@@ -13,6 +13,8 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_feature_string,
 )
@@ -22,6 +24,8 @@ class HighestMeasurementMultiple(Resource):
     """Get measurement in highest cell types"""
 
     @required_parameters('organism', 'features', 'number')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get expression in highest cell types, in one organism"""
@@ -76,9 +80,9 @@ class HighestMeasurementMultiple(Resource):
             "features": features_corrected,
             "organs": result["organs"],
             "celltypes": result["celltypes"],
-            "average": result["average"].tolist(),
-            "fraction_detected": result["fraction_detected"].tolist(),
-            "score": result["score"].tolist(),
+            "average": result["average"],
+            "fraction_detected": result["fraction_detected"],
+            "score": result["score"],
             "unit": unit,
         }
         if len(features_neg_corrected) > 0:
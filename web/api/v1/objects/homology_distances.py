@@ -75,9 +75,9 @@ class HomologyDistances(Resource):
             target_features_corrected,
         )
         result = {
-            "queries": result["queries"].values.tolist(),
-            "targets": result["targets"].values.tolist(),
-            "distances": result["distances"].values.tolist(),
+            "queries": result["queries"],
+            "targets": result["targets"],
+            "distances": result["distances"],
         }
 
         return result
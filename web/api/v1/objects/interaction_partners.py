@@ -14,9 +14,15 @@ from api.v1.exceptions import (
 )
 from api.v1.utils import (
     clean_feature_string,
+    clean_organ_string,
+    clean_celltype_string,
 )
 
 
+# Default cap on the size of multi-hop neighbourhoods (depth > 1)
+default_max_nodes = 1000
+
+
 class InteractionPartners(Resource):
     """Get partners of established cell-cell interactions"""
 
@@ -40,10 +46,48 @@ class InteractionPartners(Resource):
             idx = get_feature_index(organism, fea.lower(), measurement_type=measurement_type)
             features_corrected.append(features_all[idx])
 
+        depth = args.get("depth", 1)
+        max_nodes = args.get("max_nodes", None)
+        try:
+            depth = int(depth)
+            if max_nodes is not None:
+                max_nodes = int(max_nodes)
+        except (TypeError, ValueError):
+            abort(400, message='The "depth" and "max_nodes" parameters should be integers.')
+        if (depth <= 0) or (depth > 5):
+            abort(400, message='The "depth" parameter should be between 1 and 5.')
+        if (max_nodes is not None) and (max_nodes <= 0):
+            abort(400, message='The "max_nodes" parameter should be positive.')
+        # Direct partners are never capped by default, multi-hop neighbourhoods are
+        if (max_nodes is None) and (depth > 1):
+            max_nodes = default_max_nodes
+
+        organ = args.get("organ", None)
+        cell_type = args.get("celltype", None)
+        if organ is not None:
+            organ = clean_organ_string(organ)
+        if cell_type is not None:
+            if organ is None:
+                abort(
+                    400,
+                    message='The "celltype" parameter requires the "organ" parameter.',
+                )
+            cell_type = clean_celltype_string(cell_type)
+        min_fraction = args.get("min_fraction", 0.1)
+        try:
+            min_fraction = float(min_fraction)
+        except (TypeError, ValueError):
+            abort(400, message='The "min_fraction" parameter should be a number.')
+
         result = get_interaction_partners(
             organism,
             features_corrected,
             measurement_type=measurement_type,
+            depth=depth,
+            max_nodes=max_nodes,
+            organ=organ,
+            cell_type=cell_type,
+            min_fraction=min_fraction,
         )
 
         return result
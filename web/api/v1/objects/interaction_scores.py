@@ -0,0 +1,65 @@
+# Web imports
+from flask import request
+from flask_restful import Resource, abort
+
+# Helper functions
+from models import (
+    get_interaction_scores,
+)
+from api.v1.admission import admission_control
+from api.v1.exceptions import (
+    required_parameters,
+    model_exceptions,
+)
+from api.v1.utils import (
+    clean_organ_string,
+)
+
+
+class InteractionScores(Resource):
+    """Score cell-cell interactions between all cell types in an organ"""
+
+    @required_parameters('organism', 'organ')
+    @admission_control
+    @model_exceptions
+    def get(self):
+        """Get the top scoring interactions between cell types in an organ"""
+        args = request.args
+        measurement_type = args.get("measurement_type", "gene_expression")
+        organism = args.get("organism")
+        organ = args.get("organ")
+        organ = clean_organ_string(organ)
+        number = args.get("number", 50)
+        min_fraction = args.get("min_fraction", 0.1)
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            abort(400, message='The "number" parameter should be an integer.')
+        if number <= 0:
+            abort(400, message='The "number" parameter should be positive.')
+        elif number > 1000:
+            abort(
+                400,
+                message=f"Max number of interactions is 1000, requested: {number}.",
+            )
+
+        try:
+            min_fraction = float(min_fraction)
+        except (TypeError, ValueError):
+            abort(400, message='The "min_fraction" parameter should be a number.')
+
+        result = get_interaction_scores(
+            organism,
+            organ,
+            number=number,
+            min_fraction=min_fraction,
+            measurement_type=measurement_type,
+        )
+
+        result.update({
+            "organism": organism,
+            "organ": organ,
+            "measurement_type": measurement_type,
+        })
+        return result
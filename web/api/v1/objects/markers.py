@@ -4,6 +4,8 @@ from flask_restful import Resource, abort
 
 # Helper functions
 from models import (
+    get_celltypes,
+    get_celltype_index,
     get_markers_vs_other_celltypes,
     get_markers_vs_other_tissues,
 )
@@ -11,6 +13,8 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_organ_string,
     clean_celltype_string,
@@ -21,6 +25,8 @@ class Markers(Resource):
     """Get average measurement by cell type"""
 
     @required_parameters('organism', 'organ', 'celltype', 'number')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
@@ -49,6 +55,12 @@ class Markers(Resource):
             abort(400, message='The "number" parameter should be positive.')
 
         if versus == "other_celltypes":
+            # Typos and aliases are corrected, so report the cell type actually used
+            if cell_type != 'all':
+                cell_type = get_celltype_index(
+                    cell_type,
+                    get_celltypes(organism, organ, measurement_type=measurement_type),
+                )["celltype"]
             markers = get_markers_vs_other_celltypes(
                 organism=organism,
                 organ=organ,
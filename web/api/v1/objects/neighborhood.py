@@ -14,6 +14,8 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_feature_string,
     clean_organ_string,
@@ -25,6 +27,8 @@ class Neighborhood(Resource):
     """Get average measurement by cell type"""
 
     @required_parameters('organism', 'organ')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
@@ -56,7 +60,7 @@ class Neighborhood(Resource):
         ncells_per_cluster = neis['ncells']
         if include_embedding:
             coords_centroid = neis['coords_centroid']
-            convex_hulls = [hull.tolist() for hull in neis['convex_hull']]
+            convex_hulls = list(neis['convex_hull'])
 
         if (features is not None) and len(features):
             features_corrected = []
@@ -72,21 +76,21 @@ class Neighborhood(Resource):
             "measurement_type": measurement_type,
             "organism": organism,
             "organ": organ,
-            "ncells": ncells_per_cluster.tolist(),
+            "ncells": ncells_per_cluster,
             "celltypes": cell_types,
         }
         if (features is not None) and len(features):
             result.update({
-                "average": neis['average'].tolist(),
+                "average": neis['average'],
                 "features": features_corrected,
                 "unit": unit,
             })
         if 'fraction' in neis:
-            result["fraction_detected"] = neis['fraction'].tolist()
+            result["fraction_detected"] = neis['fraction']
 
         if include_embedding:
             result.update({
-                "centroids": coords_centroid.tolist(),
+                "centroids": coords_centroid,
                 "boundaries": convex_hulls,
             })
 
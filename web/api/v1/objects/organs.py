@@ -10,6 +10,7 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.cache import cached_response
 
 
 
@@ -17,6 +18,7 @@ class Organs(Resource):
     """Get list of tissues for an organism"""
 
     @required_parameters('organism')
+    @cached_response
     @model_exceptions
     def get(self):
         """Get list of tissues"""
@@ -8,6 +8,7 @@ from models import (
     MeasurementTypeNotFoundError,
 )
 from api.v1.exceptions import required_parameters, model_exceptions
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_celltype_string,
 )
@@ -17,6 +18,7 @@ class OrganXOrganism(Resource):
     """Get list of organs x organism for a cell type"""
 
     @required_parameters("celltype")
+    @cached_response
     @model_exceptions
     def get(self):
         """Get list of cell types for an organ and organism"""
@@ -32,7 +34,7 @@ class OrganXOrganism(Resource):
 
         organisms = list(organxorganism.columns)
         organs = list(organxorganism.index)
-        detected = organxorganism.values.tolist()
+        detected = organxorganism.values
 
         return {
             "celltype": cell_type,
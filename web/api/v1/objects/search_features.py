@@ -0,0 +1,57 @@
+# Web imports
+from flask import request
+from flask_restful import Resource, abort
+
+# Helper functions
+from models import (
+    get_feature_search_results,
+)
+from api.v1.exceptions import (
+    required_parameters,
+    model_exceptions,
+)
+
+
+class SearchFeatures(Resource):
+    """Search features by prefix or fuzzy match, e.g. for autocompletion"""
+
+    @required_parameters('organism', 'query')
+    @model_exceptions
+    def get(self):
+        """Get features starting with or close to a query string"""
+        args = request.args
+        measurement_type = args.get("measurement_type", "gene_expression")
+        organism = args.get("organism")
+        query = args.get("query").strip()
+        number = args.get("number", 10)
+        fuzzy = str(args.get("fuzzy", 'true')).lower() != 'false'
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            abort(400, message='The "number" parameter should be an integer.')
+        if number <= 0:
+            abort(400, message='The "number" parameter should be positive.')
+        elif number > 100:
+            abort(
+                400,
+                message=f"Max number of features is 100, requested: {number}.",
+            )
+        if query == "":
+            abort(400, message='The "query" parameter should not be empty.')
+
+        result = get_feature_search_results(
+            organism,
+            query,
+            number=number,
+            fuzzy=fuzzy,
+            measurement_type=measurement_type,
+        )
+
+        return {
+            "measurement_type": measurement_type,
+            "organism": organism,
+            "query": query,
+            "features": list(result["features"]),
+            "match": result["match"],
+        }
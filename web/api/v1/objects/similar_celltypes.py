@@ -13,6 +13,8 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
 from api.v1.utils import (
     clean_feature_string,
     clean_organ_string,
@@ -24,6 +26,8 @@ class SimilarCelltypes(Resource):
     """Get average measurement by cell type"""
 
     @required_parameters('organism', 'organ', 'celltype', 'features', 'number')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of features similar to the focal one"""
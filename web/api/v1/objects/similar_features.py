@@ -12,12 +12,16 @@ from api.v1.exceptions import (
     required_parameters,
     model_exceptions,
 )
+from api.v1.admission import admission_control
+from api.v1.cache import cached_response
 
 
 class SimilarFeatures(Resource):
     """Get average measurement by cell type"""
 
     @required_parameters('organism', 'organ', 'feature', 'number')
+    @cached_response
+    @admission_control
     @model_exceptions
     def get(self):
         """Get list of features similar to the focal one"""
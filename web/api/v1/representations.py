@@ -0,0 +1,85 @@
+"""Representations of API results in different media types.
+
+Results are dicts that may contain numpy arrays. JSON converts arrays to nested lists,
+while MessagePack keeps numeric arrays as raw typed buffers (see below), which is much
+faster to encode and decode and smaller on the wire for large numeric results.
+"""
+import json
+
+from lazy import lazy_import
+from flask import make_response
+
+np = lazy_import("numpy")
+msgpack = lazy_import("msgpack")
+
+
+# MessagePack extension type for numpy arrays. The payload is a packed [dtype, shape]
+# header followed by the raw array buffer in C order, e.g. [">f4", [3, 2]] + 24 bytes.
+ndarray_ext_code = 1
+
+
+def _json_default(obj):
+    """Convert numpy objects into something the JSON encoder understands."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _msgpack_default(obj):
+    """Convert numpy objects into MessagePack extension types or plain values."""
+    if isinstance(obj, np.ndarray):
+        # Only numeric and boolean arrays have a buffer worth sending as is
+        if obj.dtype.kind not in "biuf":
+            return obj.tolist()
+        obj = np.ascontiguousarray(obj)
+        header = msgpack.packb([obj.dtype.str, list(obj.shape)])
+        return msgpack.ExtType(ndarray_ext_code, header + obj.tobytes())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+def encode_json(data):
+    """Encode a result as JSON."""
+    # Always end with a new line like flask_restful does
+    return (json.dumps(data, default=_json_default) + "\n").encode()
+
+
+def encode_msgpack(data):
+    """Encode a result as MessagePack, with numpy arrays as extension types."""
+    return msgpack.packb(data, default=_msgpack_default)
+
+
+# Encoders by media type. The first one is the default, e.g. for "Accept: */*"
+encoders = {
+    "application/json": encode_json,
+    "application/msgpack": encode_msgpack,
+}
+
+
+def get_mediatype(request):
+    """Negotiate the media type of the response from the Accept header."""
+    return request.accept_mimetypes.best_match(
+        list(encoders),
+        default="application/json",
+    )
+
+
+def _make_representation(mediatype):
+    """Make a flask_restful representation function for a media type."""
+    encoder = encoders[mediatype]
+
+    def output(data, code, headers=None):
+        resp = make_response(encoder(data), code)
+        resp.headers.extend(headers or {})
+        resp.vary.add("Accept")
+        return resp
+
+    return output
+
+
+representations = {
+    mediatype: _make_representation(mediatype) for mediatype in encoders
+}
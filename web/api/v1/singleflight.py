@@ -0,0 +1,152 @@
+"""Coalescing of identical concurrent requests ("single flight").
+
+When many clients ask for the same expensive result at once, only the first one
+computes it: the others wait for it and share the serialised response. Within a
+process, waiting happens on a threading event. If a shared folder is configured, the
+same happens across worker processes on one host: computations hold an flock on one of
+a fixed set of lock files (picked by hashing the request), and the serialised response
+is handed over through a file next to them.
+
+Only requests that were already waiting when a response was written may use it, so the
+shared folder never serves as a cache. Response files are removed once they are older
+than ttl seconds; lock files are never removed, since a process may be holding or
+waiting for them. Nobody waits longer than max_wait seconds: past that, a request
+computes its response on its own.
+"""
+import fcntl
+import hashlib
+import os
+import pathlib
+import threading
+import time
+
+from config import configuration as config
+
+
+class _Flight():
+    """A computation in progress, which other threads can wait for."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.body = None
+
+
+class SingleFlight():
+    """Run each computation once across concurrent callers with the same name."""
+    def __init__(self, shared_dir=None, ttl=10, max_wait=30, nlocks=256):
+        self.shared_dir = pathlib.Path(shared_dir) if shared_dir else None
+        self.ttl = ttl
+        self.max_wait = max_wait
+        self.nlocks = nlocks
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.last_sweep = time.time()
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+
+    def run(self, name, compute):
+        """Get the result of compute(), sharing it with concurrent callers.
+
+        Args:
+            name: A file-name-safe string identifying the computation.
+            compute: Function returning (body, result): body is the serialised response
+                in bytes, or None if it should not be shared (in which case result is
+                the response to return instead).
+
+        Returns:
+            (body, result, shared) where shared tells whether the body was computed by
+            another caller.
+        """
+        with self.lock:
+            flight = self.flights.get(name, None)
+            is_leader = flight is None
+            if is_leader:
+                flight = self.flights[name] = _Flight()
+
+        if not is_leader:
+            if flight.event.wait(self.max_wait) and (flight.body is not None):
+                return flight.body, None, True
+            # The first caller failed, had nothing to share, or is taking too long
+            body, result = compute()
+            return body, result, False
+
+        try:
+            if self.shared_dir is None:
+                body, result = compute()
+                shared = False
+            else:
+                body, result, shared = self._run_shared(name, compute)
+            flight.body = body
+            return body, result, shared
+        finally:
+            with self.lock:
+                del self.flights[name]
+            flight.event.set()
+
+    def _get_lock_path(self, name):
+        """Get the lock file of a computation, one of a fixed set."""
+        digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+        return self.shared_dir / f"{int.from_bytes(digest, 'big') % self.nlocks:03d}.lock"
+
+    def _acquire(self, lock_file):
+        """Take an flock, waiting up to max_wait seconds. Returns whether it succeeded."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.01)
+
+    def _run_shared(self, name, compute):
+        """Run a computation once across processes, with a lock file."""
+        self._sweep()
+        body_path = self.shared_dir / f"{name}.body"
+        # Responses written before this point come from earlier, not concurrent, requests
+        t_start = time.time_ns()
+        with open(self._get_lock_path(name), "a") as lock_file:
+            # Waits while another process is computing the same (or a colliding) thing
+            if not self._acquire(lock_file):
+                body, result = compute()
+                return body, result, False
+            try:
+                try:
+                    if body_path.stat().st_mtime_ns >= t_start:
+                        return body_path.read_bytes(), None, True
+                except FileNotFoundError:
+                    pass
+
+                body, result = compute()
+                if body is not None:
+                    # Write atomically, so readers never see partial files
+                    tmp_path = body_path.with_suffix(f".{os.getpid()}.tmp")
+                    tmp_path.write_bytes(body)
+                    os.replace(tmp_path, body_path)
+                return body, result, False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sweep(self):
+        """Remove response files older than the time to live, once in a while."""
+        now = time.time()
+        if now - self.last_sweep < self.ttl:
+            return
+        self.last_sweep = now
+        for path in self.shared_dir.iterdir():
+            if path.suffix == ".lock":
+                continue
+            try:
+                if now - path.stat().st_mtime > self.ttl:
+                    path.unlink()
+            except FileNotFoundError:
+                # Removed by another process in the meantime
+                pass
+
+
+singleflight_config = config.get("singleflight", {})
+singleflight = SingleFlight(
+    shared_dir=singleflight_config.get("shared_dir", None),
+    ttl=singleflight_config.get("ttl", 10),
+    max_wait=singleflight_config.get("max_wait", 30),
+)
@@ -0,0 +1,126 @@
+"""Streaming of long results as NDJSON: a header line with the metadata, then one line
+per feature.
+
+GET query strings are limited in length and measurements in the number of features
+(see models.measurement.get_measurement), so long feature lists (e.g. a whole pathway or
+genome) are sent as a JSON body and results are streamed back. Feature lists themselves
+(e.g. ~1M chromatin peaks) can be streamed too.
+"""
+import json
+
+from flask import request, Response
+from flask_restful import abort
+
+from config import configuration as config
+from models import (
+    get_feature_names,
+    iter_measurement,
+)
+from api.v1.utils import (
+    get_features_or_region,
+    clean_organ_string,
+    clean_celltype_string,
+)
+
+
+# Number of feature names encoded at a time when streaming feature lists
+feature_block_size = 10000
+
+# Keys of each measurement subtype in the output
+subtype_keys = {
+    "average": "average",
+    "fraction": "fraction_detected",
+}
+
+
+def stream_measurement(measurement_subtypes):
+    """Stream measurements for the features in a JSON POST body as NDJSON."""
+    args = request.get_json(silent=True)
+    if not isinstance(args, dict):
+        abort(400, message="The request body should be a JSON object.")
+
+    organism = args.get("organism", None)
+    if organism is None:
+        abort(
+            400,
+            message='The "organism" parameter is required.',
+            error={
+                "type": "missing_parameter",
+                "missing_parameter": "organism",
+            },
+        )
+    measurement_type = args.get("measurement_type", "gene_expression")
+    features = args.get("features", None)
+    region = args.get("region", None)
+    features = get_features_or_region(features, region, organism, measurement_type)
+    if len(features) == 0:
+        abort(400, message='The "features" parameter should not be empty.')
+
+    organ = args.get("organ", None)
+    cell_type = args.get("celltype", None)
+    if (organ is None) and (cell_type is None):
+        abort(
+            400,
+            message='Either "organ" or "celltype" parameter is required.',
+            exception='missing_parameter=organ^celltype',
+        )
+    if (organ is not None) and (cell_type is not None):
+        abort(
+            400,
+            message='Only one of "organ" or "celltype" parameter can be set.',
+            error='too_many_parameters=organ^celltype',
+        )
+    if organ is not None:
+        organ = clean_organ_string(organ)
+    else:
+        cell_type = clean_celltype_string(cell_type)
+
+    # Validates all inputs, raising model exceptions before the stream starts
+    result = iter_measurement(
+        organism,
+        features,
+        measurement_type,
+        measurement_subtypes,
+        organ=organ,
+        cell_type=cell_type,
+    )
+    features_all = get_feature_names(
+        organism=organism,
+        measurement_type=measurement_type,
+    )
+
+    header = {
+        "organism": organism,
+        "measurement_type": measurement_type,
+        "unit": config['units'][measurement_type],
+    }
+    if region is not None:
+        header["region"] = region
+    header.update({key: value for key, value in result.items() if key != "blocks"})
+
+    def lines():
+        yield json.dumps(header) + "\n"
+        for idxs, data in result["blocks"]:
+            data = {subtype: values.tolist() for subtype, values in data.items()}
+            for i, idx in enumerate(idxs):
+                line = {"feature": features_all[idx]}
+                for subtype, values in data.items():
+                    line[subtype_keys[subtype]] = values[i]
+                yield json.dumps(line) + "\n"
+
+    return Response(lines(), mimetype="application/x-ndjson")
+
+
+def stream_features(header, features):
+    """Stream a header and a list (or array) of feature names as NDJSON.
+
+    Each feature is a JSON string on its own line. Features are encoded in blocks, so the
+    whole list is never converted at once.
+    """
+    def lines():
+        yield json.dumps(header) + "\n"
+        for start in range(0, len(features), feature_block_size):
+            block = features[start: start + feature_block_size]
+            yield "".join(json.dumps(feature) + "\n" for feature in block)
+
+    return Response(lines(), mimetype="application/x-ndjson")
@@ -1,6 +1,10 @@
 """Module for utility functions"""
 import re
 
+from flask_restful import abort
+
+from models import get_features_in_region
+
 
 def clean_feature_string(features, organism=None, measurement_type="gene_expression"):
     """Clean feature string and split into a list."""
@@ -40,3 +44,54 @@ def clean_celltype_string(cell_type):
     cell_type = cell_type.replace("_", " ")
     return cell_type
 
+
+def get_list_parameter(args, name, clean=None):
+    """Get a comma-separated list parameter, None if missing."""
+    value = args.get(name, None)
+    if value is None:
+        return None
+    values = [item.strip() for item in value.split(",") if item.strip()]
+    if clean is not None:
+        values = [clean(item) for item in values]
+    return values
+
+
+def get_features_or_region(features, region, organism, measurement_type="gene_expression"):
+    """Get the list of features of a request, either listed or within a genomic region.
+
+    Exactly one of features (a comma-separated string or a list) and region (e.g.
+    chr1:1000-2000) must be set. Regions are only supported for chromatin accessibility.
+    """
+    if (features is None) and (region is None):
+        abort(
+            400,
+            message='Either "features" or "region" parameter is required.',
+            exception='missing_parameter=features^region',
+        )
+    if (features is not None) and (region is not None):
+        abort(
+            400,
+            message='Only one of "features" or "region" parameter can be set.',
+            error='too_many_parameters=features^region',
+        )
+
+    if region is not None:
+        if measurement_type != "chromatin_accessibility":
+            abort(
+                400,
+                message='The "region" parameter is only supported for the "chromatin_accessibility" measurement type.',
+                error={
+                    "type": "invalid_parameter",
+                    "invalid_parameter": "region",
+                    "invalid_value": region,
+                },
+            )
+        return get_features_in_region(
+            organism,
+            region,
+            measurement_type=measurement_type,
+        )
+
+    if isinstance(features, list):
+        features = ",".join(str(fea) for fea in features)
+    return clean_feature_string(str(features), organism, measurement_type)
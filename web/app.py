@@ -1,6 +1,7 @@
 """
 Web application supporting the cell atlas approximation API
 """
+import pathlib
 
 from flask import (
     Flask,
@@ -10,12 +11,23 @@ from flask_restful import Api
 from flask_cors import CORS
 from config import configuration as config
 from api import api_dict
+from api.compression import compress_response
+from profiling import (
+    start_profiler,
+    stop_profiler,
+)
+from api.monitoring import (
+    metrics_config,
+    start_request_timer,
+    observe_request,
+    metrics_view,
+)
 
 
 ##############################
 app = Flask(__name__, static_url_path="/static", template_folder="templates")
 app_api = Api(app)
-with open("secret_key.txt") as f:
+with open(pathlib.Path(__file__).parent / "secret_key.txt") as f:
     app.config["SECRET_KEY"] = f.read()
 ##############################
 
@@ -25,6 +37,8 @@ for api_version in api_authorized_versions:
     # Connect to endpoints
     if config["api_version"] == "v1":
         get_api_endpoint = api_dict[api_version]["endpoint_handler"]
+        # Media types (e.g. JSON, MessagePack) negotiated from the Accept header
+        app_api.representations = api_dict[api_version]["representations"]
         for api_name, api_object in api_dict[api_version]["objects"].items():
             app_api.add_resource(api_object, get_api_endpoint(api_name))
 
@@ -34,6 +48,23 @@ for api_version in api_authorized_versions:
 # Cross-origin request handler
 CORS(app, resources=authorized_resources)
 
+# After-request hooks run in reverse order of registration: profiling stops first, then
+# responses are compressed, then latency is recorded including compression
+
+# Latency and error metrics, exposed to Prometheus if enabled
+app.before_request(start_request_timer)
+app.after_request(observe_request)
+if metrics_config.get("enabled", False):
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+# Compress responses if the client accepts it
+app.after_request(compress_response)
+
+# On-demand profiling of single requests. The profile report is compressed and measured
+# like any other response
+app.before_request(start_profiler)
+app.after_request(stop_profiler)
+
 
 # Main loop
 if __name__ == "__main__":
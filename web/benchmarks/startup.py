@@ -0,0 +1,103 @@
+'''
+Benchmark cold start of the web app: time to import it and to answer first requests.
+
+Each repeat runs in a fresh Python process, like a new container or worker would. Run
+from any folder, e.g.:
+
+    python benchmarks/startup.py --repeats 5
+    python benchmarks/startup.py --preload /v1/organisms "/v1/organs?organism=m_musculus"
+'''
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+
+
+web_dir = pathlib.Path(__file__).resolve().parent.parent
+
+default_requests = [
+    "/v1/organisms",
+    "/v1/organs?organism=h_sapiens",
+    "/v1/average?organism=h_sapiens&organ=lung&features=CD4,CD8A",
+]
+
+# Modules that should not be imported by the app until a request needs them
+heavy_modules = ["numpy", "pandas", "scipy", "h5py", "hdf5plugin", "levenshtein_finder"]
+
+# Code run in each fresh process, printing timings as JSON
+child_code = '''
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {web_dir!r})
+from app import app
+result = {{"import": time.perf_counter() - t0}}
+result["heavy_imported"] = [name for name in {heavy_modules!r} if name in sys.modules]
+if {preload!r}:
+    from models import preload_caches
+    t0 = time.perf_counter()
+    preload_caches()
+    result["preload"] = time.perf_counter() - t0
+client = app.test_client()
+for url in {requests!r}:
+    t0 = time.perf_counter()
+    response = client.get(url)
+    response.get_data()
+    result[url] = time.perf_counter() - t0
+    result[url + " status"] = response.status_code
+print(json.dumps(result))
+'''
+
+
+def run_once(requests, preload):
+    """Start a fresh process, import the app, answer requests, and get timings."""
+    code = child_code.format(
+        web_dir=str(web_dir),
+        heavy_modules=heavy_modules,
+        preload=preload,
+        requests=requests,
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    # The app may log to stdout, the timings are on the last line
+    return json.loads(output.strip().split("\n")[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "requests",
+        nargs="*",
+        default=default_requests,
+        help="URLs to request in order after importing the app",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="Number of fresh processes")
+    parser.add_argument(
+        "--preload",
+        action="store_true",
+        help="Preload caches before the requests, as gunicorn does by default",
+    )
+    args = parser.parse_args()
+
+    results = [run_once(args.requests, args.preload) for _ in range(args.repeats)]
+
+    steps = ["import"] + (["preload"] if args.preload else []) + args.requests
+    print(f"Median over {args.repeats} cold starts:")
+    for step in steps:
+        seconds = statistics.median(result[step] for result in results)
+        status = results[-1].get(step + " status", None)
+        suffix = f" [{status}]" if status is not None else ""
+        print(f"  {step:<70} {1000 * seconds:8.1f} ms{suffix}")
+
+    heavy = results[-1]["heavy_imported"]
+    if heavy:
+        print(f"Heavy modules imported with the app: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
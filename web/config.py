@@ -6,7 +6,20 @@ content:    Load configuration file for a specific instance. This module should
             be imported first to make sure other modules have access to the
             config values.
 '''
+import os
+import pathlib
+
 import yaml
 
-with open("config.yml") as f:
+# The configuration file sits next to this module, unless set otherwise, so the app
+# can be started from any folder (e.g. by gunicorn or a benchmark script)
+config_path = pathlib.Path(
+    os.getenv("ATLASAPPROX_CONFIG", pathlib.Path(__file__).parent / "config.yml"),
+)
+
+with open(config_path) as f:
     configuration = yaml.safe_load(f)
+
+# Relative paths are relative to the configuration file
+for key, path in configuration.get("paths", {}).items():
+    configuration["paths"][key] = str(config_path.parent / path)
@@ -0,0 +1,64 @@
+"""Gunicorn configuration for serving the API in production.
+
+Run from this folder with:
+
+    gunicorn --config gunicorn.conf.py app:app
+
+The app and all caches are loaded once in the main process before workers are forked,
+so workers share those memory pages copy-on-write. Each worker is a process with a pool
+of threads: h5py serialises HDF5 calls within a process, so throughput scales with the
+number of workers (cores), while threads keep a worker busy during network I/O.
+Workers and threads can be set via the WEB_CONCURRENCY and GUNICORN_THREADS environment
+variables.
+
+Preloading caches reads every atlas, which can take a while. For fast cold starts (e.g.
+scaling from zero), set PRELOAD_CACHES=0: the app itself imports in a fraction of a
+second because heavy dependencies are imported lazily (see lazy.py), and caches are
+filled by each worker on first use instead. The first request after such a start that
+depends on atlas content hashes (any cached endpoint) reads the atlases involved to hash
+them, unless the hashes are already stored in atlas_hashes.cache_dir (see config.yml).
+Use benchmarks/startup.py to measure.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+# Import the app (and load caches, see below) before forking workers
+preload_app = True
+
+accesslog = "-"
+
+# Workers share metrics through files in this folder, which must be set before the
+# metrics module is imported and should be empty at startup
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/atlasapprox_metrics")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def when_ready(server):
+    """Load caches in the main process, after the app is imported and before forking."""
+    if os.getenv("PRELOAD_CACHES", "1") != "0":
+        from models import preload_caches
+
+        server.log.info("Preloading atlas caches")
+        preload_caches()
+
+    # Move everything loaded so far out of garbage collector generations, so that
+    # collections in the workers do not touch (and therefore copy) the shared pages
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    """Clean up the metrics of a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
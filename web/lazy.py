@@ -0,0 +1,39 @@
+'''
+Lazy imports of heavy dependencies.
+
+Importing numpy, pandas, scipy, and h5py takes most of the startup time of the app, yet
+many requests (e.g. organisms, metrics) do not need them. Modules import them with
+
+    pd = lazy_import("pandas")
+
+and use them as usual: the actual import happens on first attribute access. Unlike
+importlib.util.LazyLoader, this is safe with threads on Python < 3.12, because
+importlib.import_module holds the import lock while the module is loaded.
+'''
+import importlib
+
+
+class LazyModule():
+    """Placeholder for a module that is imported on first attribute access."""
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found in __dict__, i.e. before the first import
+        # and for attributes added to the module later (e.g. submodules)
+        module = importlib.import_module(self._lazy_name)
+        # Copy the namespace, so later lookups skip this method altogether
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._lazy_name}'>"
+
+
+def lazy_import(name):
+    """Get a module that is imported when first used.
+
+    Args:
+        name: The full name of the module, e.g. "scipy.sparse".
+    """
+    return LazyModule(name)
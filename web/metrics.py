@@ -0,0 +1,111 @@
+'''
+Prometheus metrics for the API: request and model function latencies, errors, bytes
+read from atlas files, and response cache hits.
+
+This module does not depend on Flask, so models can record metrics without importing
+the web layer. Requests are observed, and metrics exposed at /metrics, by
+api/monitoring.py.
+
+When served by multiple worker processes (see gunicorn.conf.py), set the environment
+variable PROMETHEUS_MULTIPROC_DIR to an empty folder so that /metrics aggregates the
+metrics of all workers.
+'''
+import functools
+import os
+import time
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+
+# Buckets in seconds, from cache hits to genome-wide queries
+latency_buckets = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+request_latency = Histogram(
+    "atlasapprox_request_duration_seconds",
+    "Latency of API requests",
+    ["endpoint", "method"],
+    buckets=latency_buckets,
+)
+request_errors = Counter(
+    "atlasapprox_request_errors_total",
+    "API requests answered with an error status",
+    ["endpoint", "method", "status"],
+)
+model_latency = Histogram(
+    "atlasapprox_model_duration_seconds",
+    "Latency of model functions",
+    ["function"],
+    buckets=latency_buckets,
+)
+model_errors = Counter(
+    "atlasapprox_model_errors_total",
+    "Model function calls that raised an exception",
+    ["function", "exception"],
+)
+hdf5_bytes_read = Counter(
+    "atlasapprox_hdf5_read_bytes_total",
+    "Bytes read from atlas files",
+)
+hdf5_opens = Counter(
+    "atlasapprox_hdf5_opens_total",
+    "Number of times an atlas file was opened",
+)
+response_cache_lookups = Counter(
+    "atlasapprox_response_cache_lookups_total",
+    "Lookups in the response cache",
+    ["result"],
+)
+
+
+def observe_model(func):
+    """Decorator that records the latency and errors of a model function."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            model_errors.labels(name, type(exc).__name__).inc()
+            raise
+        finally:
+            model_latency.labels(name).observe(time.perf_counter() - t0)
+
+    return inner
+
+
+def get_thread_bytes_read():
+    """Get the number of bytes read by the current thread so far, None if unknown.
+
+    NOTE: this relies on Linux I/O accounting, which counts bytes read by system calls
+    whether or not they hit the page cache.
+    """
+    try:
+        with open("/proc/thread-self/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def get_metrics():
+    """Get all metrics in Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
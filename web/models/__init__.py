@@ -2,17 +2,26 @@
 Data models and functions for the API
 """
 
-from collections import Counter
 import os
 import pathlib
-import numpy as np
-import pandas as pd
+from lazy import lazy_import
 
 from config import configuration as config
 from models.organisms import get_organisms
+from models.versions import (
+    get_atlas_hash,
+    get_atlases_hash,
+    get_precompressed_atlas_hash,
+)
+from models.catalog import (
+    get_catalog,
+    get_catalog_presence,
+    get_atlas_sizes,
+)
 from models.paths import (
     get_atlas_path,
     get_interactions_path,
+    get_precompressed_atlas_paths,
 )
 from models.utils import ApproximationFile
 from models.exceptions import (
@@ -27,20 +36,25 @@ from models.exceptions import (
     SimilarityMethodError,
     NeighborhoodNotFoundError,
     FeaturesNotPairedError,
+    RegionFormatError,
 )
 from models.features import (
     get_features,
     get_feature_index,
     get_feature_indices,
     get_feature_names,
+    get_feature_search_results,
+    get_features_in_region,
 )
 from models.sequences import (
     get_feature_sequences,
+    iter_feature_sequences,
 )
 from models.measurement import (
     get_averages,
     get_fraction_detected,
     get_neighborhoods,
+    iter_measurement,
 )
 from models.highest_measurement import (
     get_highest_measurement,
@@ -52,6 +66,7 @@ from models.similar import (
 )
 from models.celltypes import (
     get_celltype_index,
+    get_celltype_organism_index,
 )
 from models.quantisation import (
     get_quantisation,
@@ -62,14 +77,23 @@ from models.markers import (
 )
 from models.interactions import (
     get_interaction_partners,
+    get_interaction_scores,
 )
 from models.homology import (
     get_homologs,
     get_homology_distances,
+    load_prost_embeddings,
 )
 from models.surface import (
     get_surface_genes,
 )
+from models.export import (
+    export_subset,
+    get_cached_export,
+)
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 
 def get_data_sources():
@@ -206,34 +230,47 @@ def get_celltypexorgan(
     boolean=False,
 ):
     """Get a presence/absence matrix for cell types in organs"""
+    catalog = get_catalog(measurement_type)
+    idx_rows = (catalog["rows"].get_level_values("organism") == organism).nonzero()[0]
+    if len(idx_rows) == 0:
+        # Raise the right error for missing organisms
+        get_atlas_path(organism)
+        raise MeasurementTypeNotFoundError(
+            f"Measurement type not found: {measurement_type}",
+            measurement_type=measurement_type,
+        )
+    organs_organism = pd.Series(
+        idx_rows,
+        index=catalog["rows"].get_level_values("organ")[idx_rows],
+    )
+
     # Get organs
     if organs is None:
-        organs = list(
-            get_organs(
-                organism=organism,
-                measurement_type=measurement_type,
+        organs = organs_organism.index
+    for organ in organs:
+        if organ not in organs_organism.index:
+            raise OrganNotFoundError(
+                f"Organ not found: {organ}",
+                organ=organ,
             )
-        )
+    organs = sorted(set(organs))
 
     # Get celltypes
-    organs_celltypes = Counter()
-    for organ in organs:
-        celltypes_organ = get_celltype_abundance(
-            organism=organism,
-            organ=organ,
-            measurement_type=measurement_type,
-        )
-        for celltype, abundance in celltypes_organ.items():
-            organs_celltypes[(organ, celltype)] = abundance
+    abundance = catalog["abundance"][organs_organism.loc[organs].values]
+    idx_celltypes = np.unique(abundance.nonzero()[1])
 
     dtype = bool if boolean else int
     # Cell types are rows, organs are columns
-    data = pd.Series(organs_celltypes).unstack(0, fill_value=0).astype(dtype)
+    data = pd.DataFrame(
+        abundance[:, idx_celltypes].toarray().T,
+        index=catalog["celltypes"][idx_celltypes],
+        columns=organs,
+    ).astype(dtype)
 
     # Sort from the cell types with the highest abundance
     # NOTE: a double sort by this and secondarily by organ name might be
     # even better perhaps
-    data = data.loc[(data != 0).sum(axis=1).sort_values(ascending=False).index]
+    data = data.loc[(data != 0).sum(axis=1).sort_values(ascending=False, kind="stable").index]
 
     return data
 
@@ -243,25 +280,18 @@ def get_organxorganism(
     measurement_type="gene_expression",
 ):
     """Get a presence/absence matrix of a cell type across organs and organisms."""
-    organisms = get_organisms(
-        measurement_type=measurement_type,
-    )
-
-    res = {}
-    for organism in organisms:
-        data = get_celltypexorgan(
-            organism,
-            measurement_type=measurement_type,
+    catalog = get_catalog(measurement_type)
+    if celltype not in catalog["celltypes"]:
+        raise CellTypeNotFoundError(
+            f"Cell type not found: {celltype}",
+            cell_type=celltype,
         )
-        if celltype not in data.index:
-            continue
-        organs = data.columns[data.loc[celltype] > 0].tolist()
-        for organ in organs:
-            res[(organism, organ)] = 1
-    res = pd.Series(res).unstack(0, fill_value=0)
 
-    # Exclude organism if it does not have that cell type
-    res = res.loc[:, res.any(axis=0)]
+    idx_celltype = catalog["celltypes"].get_loc(celltype)
+    is_present = catalog["abundance"][:, idx_celltype].toarray().ravel() > 0
+
+    # Organs are rows, organisms are columns. Organisms without that cell type are excluded
+    res = pd.Series(1, index=catalog["rows"][is_present]).unstack(0, fill_value=0)
 
     return res
 
@@ -270,19 +300,29 @@ def get_celltypexorganism(
     measurement_type="gene_expression",
 ):
     """Get a presence/absence matrix of a cell type across organs and organisms."""
-    organisms = get_organisms(
-        measurement_type=measurement_type,
-    )
-
-    res = {}
-    for organism in organisms:
-        data = get_celltypexorgan(
-            organism,
-            measurement_type=measurement_type,
-        )
-        celltypes = data.loc[(data > 0).any(axis=1)].index.tolist()
-        for celltype in celltypes:
-            res[(organism, celltype)] = 1
-    res = pd.Series(res).unstack(0, fill_value=0)
-
-    return res
+    return get_catalog_presence(measurement_type)
+
+
+def preload_caches():
+    """Load lookup tables and caches of all atlases into memory.
+
+    This is meant to be called once before forking server workers, so that they all
+    share the same memory pages (copy-on-write) instead of each building their own
+    caches on their first requests.
+    """
+    for measurement_type in config["feature_types"]:
+        for organism in get_organisms(measurement_type=measurement_type):
+            get_atlas_hash(organism)
+            for encoding in get_precompressed_atlas_paths(organism):
+                get_precompressed_atlas_hash(organism, encoding)
+            get_feature_names(organism, measurement_type=measurement_type)
+            try:
+                get_quantisation(organism, measurement_type)
+            except KeyError:
+                # Not quantised
+                pass
+        get_catalog(measurement_type)
+    get_atlases_hash()
+
+    if os.path.exists(config["paths"]["protein_embeddings"]):
+        load_prost_embeddings()
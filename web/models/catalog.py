@@ -0,0 +1,147 @@
+"""Catalog of organs and cell types across all atlases, kept in memory.
+
+Cross-organism queries (e.g. which organisms have a certain cell type) would otherwise
+need to open every atlas file, often many times per request.
+"""
+import os
+
+from lazy import lazy_import
+
+from models.organisms import get_organisms
+from models.paths import get_atlas_path
+from models.utils import ApproximationFile
+from models.exceptions import MeasurementTypeNotFoundError
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+sparse = lazy_import("scipy.sparse")
+
+
+# This dict has measurement types as keys and catalogs as values. Each catalog is a dict
+# with the atlas modification times (to rebuild the catalog if any atlas changes), the
+# (organism, organ) pairs as rows, all cell types sorted alphabetically as columns, and
+# a sparse integer matrix with the number of cells of each type in each organ
+catalogs = {}
+
+# This dict has (organism, measurement_type) as keys and the sizes of each atlas (see
+# get_atlas_sizes) as values, for estimating the cost of requests without reading names
+atlas_sizes = {}
+
+
+def _get_atlas_mtimes(measurement_type):
+    """Get the modification time of each atlas with a measurement type."""
+    return {
+        organism: os.stat(get_atlas_path(organism)).st_mtime
+        for organism in get_organisms(measurement_type=measurement_type)
+    }
+
+
+def load_catalog(measurement_type="gene_expression"):
+    """Read organs, cell types, and abundances of all atlases, opening each file once."""
+    mtimes = _get_atlas_mtimes(measurement_type)
+
+    organisms = []
+    organs = []
+    celltypes = []
+    cell_counts = []
+    for organism in mtimes:
+        approx_path = get_atlas_path(organism)
+        with ApproximationFile(approx_path) as db:
+            group = db["measurements"][measurement_type]
+            gby = group["grouped_by"]["tissue->celltype"]
+            for organ in gby["values"]["tissue"].asstr()[:]:
+                data = group["data"]["tissue->celltype"][organ]
+                organisms.append(organism)
+                organs.append(organ)
+                celltypes.append(data["obs_names"].asstr()[:])
+                cell_counts.append(data["cell_count"][:])
+
+    rows = pd.MultiIndex.from_arrays([organisms, organs], names=["organism", "organ"])
+    idx_rows = np.repeat(np.arange(len(rows)), [len(cts) for cts in celltypes])
+    celltypes = np.concatenate(celltypes) if celltypes else np.array([], dtype=str)
+    cell_counts = np.concatenate(cell_counts) if cell_counts else np.array([], dtype=int)
+    columns = np.unique(celltypes)
+    idx_columns = np.searchsorted(columns, celltypes)
+    abundance = sparse.csr_matrix(
+        (cell_counts, (idx_rows, idx_columns)),
+        shape=(len(rows), len(columns)),
+    )
+
+    catalogs[measurement_type] = {
+        "mtimes": mtimes,
+        "rows": rows,
+        "celltypes": pd.Index(columns),
+        "abundance": abundance,
+        "derived": {},
+    }
+
+
+def get_catalog(measurement_type="gene_expression"):
+    """Get the cached catalog for a measurement type, rebuilding it if any atlas changed."""
+    catalog = catalogs.get(measurement_type, None)
+    if (catalog is None) or (catalog["mtimes"] != _get_atlas_mtimes(measurement_type)):
+        load_catalog(measurement_type)
+    return catalogs[measurement_type]
+
+
+def get_catalog_presence(measurement_type="gene_expression"):
+    """Get a cell type x organism presence matrix from the catalog (cached)."""
+    catalog = get_catalog(measurement_type)
+    if "celltypexorganism" not in catalog["derived"]:
+        organisms, idx_organisms = np.unique(
+            catalog["rows"].get_level_values("organism"), return_inverse=True,
+        )
+        # Sum (organism, organ) rows by organism with a sparse indicator matrix
+        indicator = sparse.csr_matrix(
+            (np.ones(len(idx_organisms), int), (idx_organisms, np.arange(len(idx_organisms)))),
+            shape=(len(organisms), len(idx_organisms)),
+        )
+        presence = (indicator @ (catalog["abundance"] > 0).astype(int)).toarray().T > 0
+        presence = pd.DataFrame(
+            presence.astype(int),
+            index=catalog["celltypes"],
+            columns=organisms,
+        )
+        catalog["derived"]["celltypexorganism"] = presence.loc[presence.any(axis=1)]
+    return catalog["derived"]["celltypexorganism"]
+
+
+def load_atlas_sizes(organism, measurement_type="gene_expression"):
+    """Read the number of features and of cell types per organ of an atlas.
+
+    Only dataset shapes are read, not names, so this is fast even for large atlases.
+    """
+    approx_path = get_atlas_path(organism)
+    mtime = os.stat(approx_path).st_mtime
+    with ApproximationFile(approx_path) as db:
+        if measurement_type not in db["measurements"]:
+            raise MeasurementTypeNotFoundError(
+                f"Measurement type not found: {measurement_type}",
+                measurement_type=measurement_type,
+            )
+        group = db["measurements"][measurement_type]
+        data = group["data"]["tissue->celltype"]
+        ngroups = {
+            organ: data[organ]["obs_names"].shape[0]
+            for organ in group["grouped_by"]["tissue->celltype"]["values"]["tissue"].asstr()[:]
+        }
+        nfeatures = group["var_names"].shape[0]
+
+    atlas_sizes[(organism, measurement_type)] = {
+        "mtime": mtime,
+        "nfeatures": nfeatures,
+        "ngroups": ngroups,
+    }
+
+
+def get_atlas_sizes(organism, measurement_type="gene_expression"):
+    """Get the cached sizes of an atlas, reading them again if the atlas changed.
+
+    Returns:
+        A dict with the number of features ("nfeatures") and a dict with the number of
+        cell types of each organ ("ngroups").
+    """
+    sizes = atlas_sizes.get((organism, measurement_type), None)
+    if (sizes is None) or (sizes["mtime"] != os.stat(get_atlas_path(organism)).st_mtime):
+        load_atlas_sizes(organism, measurement_type)
+    return atlas_sizes[(organism, measurement_type)]
@@ -1,20 +1,95 @@
 """Module to access, validate, and correct cell types."""
-
-from levenshtein_finder import LevenshteinFinder
-
+from config import configuration as config
 from models.exceptions import (
     CellTypeNotFoundError,
 )
 
 
+# Fuzzy indices for autocorrection, built lazily and cached by the tuple of cell types
+# they index, so each organ (and each organism as a whole) gets its own index that is
+# reused across calls and automatically replaced if the cell types change.
+celltype_finders = {}
+
+
+def load_celltype_finder(celltypes):
+    """Index cell types and their aliases for exact and fuzzy lookup."""
+    from levenshtein_finder import LevenshteinFinder
+
+    names = list(celltypes)
+    targets = list(range(len(celltypes)))
+
+    # Aliases point to the first cell type of their group that is present
+    for aliases in config.get("celltype_aliases", []):
+        present = [alias for alias in aliases if alias in celltypes]
+        if len(present) == 0:
+            continue
+        target = celltypes.index(present[0])
+        for alias in aliases:
+            if alias not in celltypes:
+                names.append(alias)
+                targets.append(target)
+
+    finder = LevenshteinFinder()
+    finder.indexing(names)
+
+    exact = {}
+    for name, target in zip(names, targets):
+        exact.setdefault(name, target)
+
+    celltype_finders[tuple(celltypes)] = {
+        "finder": finder,
+        "targets": targets,
+        "exact": exact,
+        # Characters of the indexed names: the finder crashes on any other character
+        "alphabet": frozenset("".join(names)),
+    }
+
+
+def get_celltype_finder(celltypes):
+    """Get the cached fuzzy index for a list of cell types."""
+    key = tuple(celltypes)
+    if key not in celltype_finders:
+        load_celltype_finder(list(key))
+    return celltype_finders[key]
+
+
+def _search_celltype(index, celltype, max_distance):
+    """Find indexed names within edit distance of a cell type, closest first."""
+    from levenshtein_finder import levenshtein
+
+    # Characters absent from every indexed name cannot match and crash the finder, so
+    # search without them. That can only underestimate distances, so if any were left out
+    # the hits are checked against the full query
+    query = "".join(char for char in celltype if char in index["alphabet"])
+    nunseen = len(celltype) - len(query)
+    if nunseen > max_distance:
+        return []
+
+    hits = index["finder"].search(query, max_distance=max_distance)
+    if nunseen > 0:
+        for hit in hits:
+            hit["distance"] = levenshtein(list(celltype), list(hit["data"]))
+        hits = [hit for hit in hits if hit["distance"] <= max_distance]
+        hits.sort(key=lambda hit: (hit["distance"], hit["idx"]))
+
+    # NOTE: this list is longer then one only for ties, in which case the first should be fine
+    return hits
+
+
 def get_celltype_index(celltype, celltypes, max_distance=3):
-    """Get cell type index and correct cell type name if requested."""
+    """Get cell type index and correct cell type name if requested.
+
+    Aliases from the configuration (e.g. phagocyte for macrophage) are resolved to the
+    cell type they stand for, both exactly and with autocorrection.
+    """
     celltypes = list(celltypes)
+    index = get_celltype_finder(celltypes)
 
-    if celltype in celltypes:
+    if celltype in index["exact"]:
+        idx = index["exact"][celltype]
         result = {
-            "index": celltypes.index(celltype),
-            "celltype": celltype,
+            "index": idx,
+            "celltype": celltypes[idx],
         }
         return result
 
@@ -25,18 +100,33 @@ def get_celltype_index(celltype, celltypes, max_distance=3):
         )
 
     # Autocorrection
-    finder = LevenshteinFinder()
-    finder.indexing(celltypes)
-    # NOTE: this list is longer then one only for ties, in which case the first should be fine
-    celltypes_close = finder.search(celltype, max_distance=max_distance)
+    celltypes_close = _search_celltype(index, celltype, max_distance)
     if len(celltypes_close) == 0:
         raise CellTypeNotFoundError(
             f"No cell type called {celltype} found.",
             cell_type=celltype,
         )
 
+    idx = index["targets"][celltypes_close[0]["idx"]]
     result = {
-        "index": celltypes_close[0]["idx"],
-        "celltype": celltypes_close[0]["data"],
+        "index": idx,
+        "celltype": celltypes[idx],
     }
     return result
+
+
+def get_celltype_organism_index(
+    organism,
+    celltype,
+    measurement_type="gene_expression",
+    max_distance=3,
+):
+    """Correct a cell type name against all cell types of an organism."""
+    from models import get_celltypes
+
+    celltypes = get_celltypes(
+        organism,
+        None,
+        measurement_type=measurement_type,
+    )
+    return get_celltype_index(celltype, celltypes, max_distance=max_distance)
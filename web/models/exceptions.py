@@ -38,6 +38,12 @@ class FeatureSequencesNotFoundError(KeyError):
         super().__init__(self, msg)
 
 
+class RegionFormatError(ValueError):
+    def __init__(self, msg, region):
+        self.region = region
+        super().__init__(self, msg)
+
+
 class TooManyFeaturesError(ValueError):
     pass
 
@@ -0,0 +1,413 @@
+"""Export of approximation subsets (organs, cell types, features, measurement types).
+
+Subsets are written in the same format as whole approximations: same groups, same
+quantisation, and the same "grouped_by" structure, so they can be read by this module's
+models or the language-specific packages like any other approximation. Large matrices
+are copied in blocks of whole chunks, so each chunk of the source atlas is read and
+decompressed once.
+
+Exported files are cached in a folder, named by a hash of the atlas content and of the
+resolved subset, so repeated exports are served straight from disk. The least recently
+used files are removed once the folder exceeds its configured size, except those used
+in the last minute.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+
+from lazy import lazy_import
+
+from config import configuration as config
+from models.paths import get_atlas_path
+from models.utils import ApproximationFile
+from models.versions import get_atlas_hash
+from models.exceptions import (
+    MeasurementTypeNotFoundError,
+    OrganNotFoundError,
+    CellTypeNotFoundError,
+    SomeFeaturesNotFoundError,
+)
+from models.features import (
+    filter_existing_features,
+    get_feature_indices,
+)
+
+np = lazy_import("numpy")
+h5py = lazy_import("h5py")
+
+
+export_config = config.get("export", {})
+
+# Folder of exported subsets, and its maximal size in bytes
+cache_dir = pathlib.Path(export_config.get("cache_dir", "/tmp/atlasapprox_exports"))
+cache_max_bytes = export_config.get("max_bytes", 10 * 1024 ** 3)
+
+# Exports used less than this many seconds ago are never removed, so files are not
+# removed between being found in the cache and being sent
+min_age = export_config.get("min_age", 60)
+
+# Number of columns (features) copied at a time, rounded to whole chunks
+copy_block_size = 4096
+
+# Datasets of organs and neighborhoods with one column per feature
+feature_datasets = ("average", "fraction")
+
+
+def _resolve_subset(db, organism, measurement_types, organs, celltypes, features):
+    """Check a subset against an atlas and get what to keep of each measurement type.
+
+    Returns:
+        dict with measurement types as keys. Each value is a dict with the organs to keep
+        (as a dict of organ -> sorted indices of cell types) and the sorted indices of
+        features to keep (None for all).
+    """
+    available = list(db["measurements"].keys())
+    if measurement_types is None:
+        measurement_types = available
+    for measurement_type in measurement_types:
+        if measurement_type not in available:
+            raise MeasurementTypeNotFoundError(
+                f"Measurement type not found: {measurement_type}",
+                measurement_type=measurement_type,
+            )
+
+    subset = {}
+    organs_found = set()
+    celltypes_found = set()
+    features_found = set()
+    for measurement_type in measurement_types:
+        group = db["measurements"][measurement_type]
+
+        idx_features = None
+        if features is not None:
+            features_type = filter_existing_features(organism, features, measurement_type)
+            if len(features_type) == 0:
+                continue
+            features_found |= set(features_type)
+            idx_features = np.unique(get_feature_indices(organism, features_type, measurement_type))
+
+        organs_type = group["grouped_by"]["tissue->celltype"]["values"]["tissue"].asstr()[:]
+        if organs is not None:
+            organs_found |= set(organs) & set(organs_type)
+            organs_type = [organ for organ in organs_type if organ in organs]
+
+        organ_rows = {}
+        for organ in organs_type:
+            obs_names = group["data"]["tissue->celltype"][organ]["obs_names"].asstr()[:]
+            if celltypes is None:
+                rows = np.arange(len(obs_names))
+            else:
+                rows = np.flatnonzero(np.isin(obs_names, celltypes))
+                celltypes_found |= set(obs_names[rows])
+            if len(rows):
+                organ_rows[organ] = rows
+
+        if len(organ_rows):
+            subset[measurement_type] = {
+                "organs": organ_rows,
+                "features": idx_features,
+            }
+
+    # Report requests that match nothing at all
+    if organs is not None:
+        for organ in organs:
+            if organ not in organs_found:
+                raise OrganNotFoundError(f"Organ not found: {organ}", organ=organ)
+    if celltypes is not None:
+        for cell_type in celltypes:
+            if cell_type not in celltypes_found:
+                raise CellTypeNotFoundError(
+                    f"Cell type not found: {cell_type}",
+                    cell_type=cell_type,
+                )
+    if features is not None:
+        missing = [fea for fea in features if fea not in features_found]
+        if len(missing):
+            raise SomeFeaturesNotFoundError(
+                "Some features not found: " + ", ".join(missing) + ".",
+                features=missing,
+            )
+    return subset
+
+
+def _get_subset_hash(organism, subset):
+    """Get a hash identifying a resolved subset of the current atlas of an organism."""
+    description = {
+        measurement_type: {
+            "organs": {organ: rows.tolist() for organ, rows in selection["organs"].items()},
+            "features": (
+                None if selection["features"] is None else selection["features"].tolist()
+            ),
+        }
+        for measurement_type, selection in subset.items()
+    }
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(organism.encode())
+    digest.update(get_atlas_hash(organism).encode())
+    digest.update(json.dumps(description, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _copy_attrs(src, dst):
+    for key, value in src.attrs.items():
+        dst.attrs[key] = value
+
+
+def _copy_matrix(src, dst_group, name, rows=None, cols=None):
+    """Copy a (rows, features) matrix, keeping some rows and features, chunk by chunk."""
+    import hdf5plugin
+
+    nrows = src.shape[0] if rows is None else len(rows)
+    ncols = src.shape[1] if cols is None else len(cols)
+    kwargs = {}
+    step = copy_block_size
+    if src.chunks is not None:
+        kwargs["chunks"] = (
+            max(min(src.chunks[0], nrows), 1),
+            max(min(src.chunks[1], ncols), 1),
+        )
+        kwargs.update(hdf5plugin.Zstd())
+        step = src.chunks[1] * max(1, copy_block_size // src.chunks[1])
+    dst = dst_group.create_dataset(name, shape=(nrows, ncols), dtype=src.dtype, **kwargs)
+    _copy_attrs(src, dst)
+
+    if (nrows == 0) or (ncols == 0):
+        return
+
+    for start in range(0, src.shape[1], step):
+        stop = min(start + step, src.shape[1])
+        if cols is None:
+            lo, hi = start, stop
+            block = src[:, start:stop]
+        else:
+            lo, hi = np.searchsorted(cols, [start, stop])
+            if lo == hi:
+                continue
+            # One contiguous slab within the block, then pick the columns in memory
+            block = src[:, cols[lo]: cols[hi - 1] + 1]
+            block = block[:, cols[lo:hi] - cols[lo]]
+        if rows is not None:
+            block = block[rows]
+        dst[:, lo:hi] = block
+
+
+def _copy_dataset(src, dst_group, name, rows=None, cols=None):
+    """Copy a dataset, keeping some rows (first axis) and/or columns (second axis)."""
+    if (rows is None) and (cols is None):
+        # Exact copy, including compression
+        src.parent.copy(src, dst_group, name=name)
+        return
+
+    if (src.ndim == 2) and (src.chunks is not None):
+        _copy_matrix(src, dst_group, name, rows=rows, cols=cols)
+        return
+
+    data = src[()]
+    if rows is not None:
+        data = data[rows]
+    if cols is not None:
+        data = data[:, cols]
+    dst = dst_group.create_dataset(name, data=data, dtype=src.dtype)
+    _copy_attrs(src, dst)
+
+
+def _copy_organ(src, dst_group, name, rows, cols):
+    """Copy the data of one organ (or its neighborhoods), keeping some rows and features.
+
+    Datasets with one row per cell type lose the rows of cell types not kept. Average
+    and fraction datasets also lose the columns of features not kept. Neighborhoods are
+    not split by cell type, so only their features are subset.
+    """
+    dst = dst_group.create_group(name)
+    _copy_attrs(src, dst)
+    ncelltypes = src["obs_names"].shape[0] if "obs_names" in src else None
+    for key, item in src.items():
+        if isinstance(item, h5py.Group):
+            _copy_organ(item, dst, key, None, cols)
+            continue
+        rows_item = None
+        if (rows is not None) and (item.ndim >= 1) and (item.shape[0] == ncelltypes):
+            rows_item = rows
+        cols_item = cols if key in feature_datasets else None
+        _copy_dataset(item, dst, key, rows=rows_item, cols=cols_item)
+
+
+def _create_strings(group, name, strings, dtype):
+    """Create a dataset of strings with the same type as the original one."""
+    if dtype.kind == "S":
+        data = np.array([string.encode() for string in strings], dtype=dtype)
+    else:
+        data = np.array(strings, dtype=object)
+    group.create_dataset(name, data=data, dtype=dtype)
+
+
+def _write_subset(db, out, subset):
+    """Write a subset of an open approximation into an open, empty h5 file."""
+    _copy_attrs(db, out)
+    for key, item in db.items():
+        if key != "measurements":
+            db.copy(item, out, name=key)
+
+    measurements = out.create_group("measurements")
+    _copy_attrs(db["measurements"], measurements)
+    for measurement_type, selection in subset.items():
+        src = db["measurements"][measurement_type]
+        dst = measurements.create_group(measurement_type)
+        _copy_attrs(src, dst)
+        cols = selection["features"]
+        nfeatures = src["var_names"].shape[0]
+        organ_rows = selection["organs"]
+
+        for key, item in src.items():
+            if key == "var_names":
+                _copy_dataset(item, dst, key, rows=cols)
+            elif key == "feature_sequences":
+                group = dst.create_group(key)
+                _copy_attrs(item, group)
+                for name, dataset in item.items():
+                    rows = cols if dataset.shape[0] == nfeatures else None
+                    _copy_dataset(dataset, group, name, rows=rows)
+            elif key == "grouped_by":
+                gby_src = item["tissue->celltype"]
+                gby = dst.create_group(key).create_group("tissue->celltype")
+                _copy_attrs(gby_src, gby)
+                for name, value in gby_src.items():
+                    if name != "values":
+                        gby_src.copy(value, gby, name=name)
+                values = gby.create_group("values")
+                _copy_attrs(gby_src["values"], values)
+                # Keep organs and cell types in their original order
+                organs = [
+                    organ for organ in gby_src["values"]["tissue"].asstr()[:]
+                    if organ in organ_rows
+                ]
+                celltypes_kept = set()
+                for organ, rows in organ_rows.items():
+                    obs_names = src["data"]["tissue->celltype"][organ]["obs_names"].asstr()[:]
+                    celltypes_kept |= set(obs_names[rows])
+                celltypes = [
+                    cell_type for cell_type in gby_src["values"]["celltype"].asstr()[:]
+                    if cell_type in celltypes_kept
+                ]
+                for name, names in (("tissue", organs), ("celltype", celltypes)):
+                    _create_strings(values, name, names, gby_src["values"][name].dtype)
+                for name, value in gby_src["values"].items():
+                    if name not in ("tissue", "celltype"):
+                        gby_src["values"].copy(value, values, name=name)
+            elif key == "data":
+                data = dst.create_group(key).create_group("tissue->celltype")
+                for organ, rows in organ_rows.items():
+                    organ_src = item["tissue->celltype"][organ]
+                    # All cell types kept means no row selection at all
+                    if len(rows) == organ_src["obs_names"].shape[0]:
+                        rows = None
+                    _copy_organ(organ_src, data, organ, rows, cols)
+            else:
+                # e.g. quantisation
+                src.copy(item, dst, name=key)
+
+
+def _evict_exports():
+    """Remove the least recently used exports until the cache fits its size."""
+    now = time.time()
+    stats = []
+    for path in cache_dir.glob("*.h5"):
+        try:
+            stats.append((path, path.stat()))
+        except FileNotFoundError:
+            # Removed by another process in the meantime
+            pass
+    stats.sort(key=lambda item: item[1].st_mtime)
+    total = sum(stat.st_size for _, stat in stats)
+    for path, stat in stats[:-1]:
+        # Recently used exports may be about to be sent, and all later ones too
+        if (total <= cache_max_bytes) or (now - stat.st_mtime < min_age):
+            break
+        total -= stat.st_size
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            # Removed by another process in the meantime
+            pass
+
+
+def _get_export_path(organism, measurement_types, organs, celltypes, features):
+    """Check a subset and get the path of its exported file, which may not exist yet.
+
+    Returns:
+        (path, subset, subset hash)
+    """
+    approx_path = get_atlas_path(organism)
+    with ApproximationFile(approx_path) as db:
+        subset = _resolve_subset(
+            db, organism, measurement_types, organs, celltypes, features,
+        )
+    subset_hash = _get_subset_hash(organism, subset)
+    return cache_dir / f"{organism}-{subset_hash}.h5", subset, subset_hash
+
+
+def get_cached_export(
+    organism,
+    measurement_types=None,
+    organs=None,
+    celltypes=None,
+    features=None,
+):
+    """Get the path of an exported subset if it is in the cache, None otherwise.
+
+    Arguments are as for export_subset, which raises the same exceptions.
+    """
+    export_path, _, _ = _get_export_path(
+        organism, measurement_types, organs, celltypes, features,
+    )
+    return export_path if export_path.exists() else None
+
+
+def export_subset(
+    organism,
+    measurement_types=None,
+    organs=None,
+    celltypes=None,
+    features=None,
+):
+    """Export a subset of an approximation as an h5 file in the same format.
+
+    Args:
+        organism: The organism of choice.
+        measurement_types: Measurement types to keep (None for all).
+        organs: Organs to keep (None for all).
+        celltypes: Cell types to keep (None for all), in the organs kept.
+        features: Features to keep (lowercase, None for all), in each measurement type.
+            Measurement types without any of them are left out.
+
+    Returns:
+        (path, subset hash): The path of the exported file and a hash that identifies it.
+    """
+    export_path, subset, subset_hash = _get_export_path(
+        organism, measurement_types, organs, celltypes, features,
+    )
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        # Mark as recently used, which also keeps it from eviction until it is sent
+        os.utime(export_path)
+        return export_path, subset_hash
+    except FileNotFoundError:
+        # Not exported yet, or removed in the meantime
+        pass
+
+    # Write to a temporary file first, so partial files are never served
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as f:
+        tmp_path = pathlib.Path(f.name)
+    try:
+        with ApproximationFile(get_atlas_path(organism)) as db, h5py.File(tmp_path, "w") as out:
+            _write_subset(db, out, subset)
+        os.replace(tmp_path, export_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    _evict_exports()
+    return export_path, subset_hash
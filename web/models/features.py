@@ -4,8 +4,9 @@ The main purpose of this is to enable fast browsing of the h5 file.
 
 NOTE: we do not correct feature names as we do with cell types because it's impossible to know what the user really intended (e.g. Cb19 -> ??)
 """
-import numpy as np
-import pandas as pd
+import re
+
+from lazy import lazy_import
 
 from config import configuration as config
 from models.paths import get_atlas_path
@@ -14,15 +15,35 @@ from models.exceptions import (
     FeatureNotFoundError,
     OrganismNotFoundError,
     MeasurementTypeNotFoundError,
+    RegionFormatError,
     SimilarityMethodError,
     SomeFeaturesNotFoundError,
 )
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
 # This dict has (organism, measurement_type) as keys and pandas series as
 # values. For each series, the *index* is the array of features, the values
 # are increasing integers to be used as an index in the h5 file
 feature_series = {}
 
+# Genomic interval indices for features that are genomic regions (e.g. chromatin peaks
+# called chr1-1000-1500), with (organism, measurement_type) as keys. Each is a dict with
+# lowercase chromosome names as keys, and as values a dict with peak starts sorted
+# increasingly, the corresponding ends and rows in the feature_series frame, and the
+# maximal peak length (to bound the binary search for overlaps)
+feature_intervals = {}
+region_regex = r'^(?P<chromosome>.+?)[:_-](?P<start>\d+)[_-](?P<end>\d+)$'
+
+# Search indices for feature autocompletion, with (organism, measurement_type) as keys.
+# Each is a dict with the lowercase features sorted alphabetically (for prefix search
+# via binary search) and their rows in the feature_series frame. A fuzzy index is added
+# lazily on first use, and only for measurement types with not too many features
+# (e.g. not for chromatin peaks, where fuzzy matches make little sense anyway)
+feature_search_indices = {}
+max_features_fuzzy = 200000
+
 
 def load_features(organism, measurement_type="gene_expression"):
     """Preload list of features for an organism"""
@@ -127,3 +148,176 @@ def filter_existing_features(
     feature_names = pd.Index(feature_names)
     feature_names = feature_names[feature_names.isin(get_features(organism, measurement_type=measurement_type))]
     return feature_names.values
+
+
+def _get_deletions(word):
+    """Get all strings obtained by deleting one character from a word."""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _get_edit_distance(word1, word2):
+    """Get the Levenshtein distance between two (short) strings."""
+    previous = list(range(len(word2) + 1))
+    for i, char1 in enumerate(word1, 1):
+        current = [i]
+        for j, char2 in enumerate(word2, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char1 != char2),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def _build_fuzzy_index(features_lower, rows):
+    """Build a deletion index to find features within one or two edits of a query.
+
+    Two strings within one edit (substitution, insertion, or deletion) share at least
+    one entry among themselves and their single-character deletions, so each lookup is
+    a handful of dict accesses instead of a scan of all features. Some strings two
+    edits apart are found too, and ranked after the closer ones.
+    """
+    fuzzy = {}
+    for row, feature in zip(rows, features_lower):
+        for key in _get_deletions(feature) | {feature}:
+            fuzzy.setdefault(key, []).append(row)
+    return fuzzy
+
+
+def load_feature_search_index(organism, measurement_type="gene_expression"):
+    """Build a sorted index of feature names for prefix search"""
+    if (organism, measurement_type) not in feature_series:
+        load_features(organism, measurement_type)
+
+    features_lower = feature_series[(organism, measurement_type)].index.values.astype(str)
+    order = np.argsort(features_lower, kind="stable")
+    feature_search_indices[(organism, measurement_type)] = {
+        "sorted": features_lower[order],
+        "rows": order,
+    }
+
+
+def get_feature_search_results(
+    organism,
+    query,
+    number=10,
+    fuzzy=True,
+    measurement_type="gene_expression",
+):
+    """Get features starting with, or otherwise close to, a query string.
+
+    Prefix matches come first, in alphabetical order, followed by close fuzzy matches if
+    there are not enough prefix matches.
+
+    Returns:
+        dict with "features" (with correct capitalization) and "match" (either "prefix"
+        or "fuzzy" for each feature).
+    """
+    if (organism, measurement_type) not in feature_search_indices:
+        load_feature_search_index(organism, measurement_type)
+    index = feature_search_indices[(organism, measurement_type)]
+    names = feature_series[(organism, measurement_type)]["name"].values
+
+    query = query.lower()
+    start = np.searchsorted(index["sorted"], query, side="left")
+    end = np.searchsorted(index["sorted"], query + "\U0010ffff", side="left")
+    rows = list(index["rows"][start: min(end, start + number)])
+    match = ["prefix"] * len(rows)
+
+    nfeatures = len(index["rows"])
+    if fuzzy and (len(rows) < number) and (nfeatures <= max_features_fuzzy):
+        if "fuzzy" not in index:
+            index["fuzzy"] = _build_fuzzy_index(index["sorted"], index["rows"])
+        rows_fuzzy = set()
+        for key in _get_deletions(query) | {query}:
+            rows_fuzzy.update(index["fuzzy"].get(key, []))
+        # Closest first, then alphabetical
+        rows_fuzzy = sorted(
+            rows_fuzzy - set(rows),
+            key=lambda row: (_get_edit_distance(query, names[row].lower()), names[row].lower()),
+        )
+        rows_fuzzy = rows_fuzzy[:number - len(rows)]
+        rows.extend(rows_fuzzy)
+        match.extend(["fuzzy"] * len(rows_fuzzy))
+
+    return {
+        "features": names[rows] if len(rows) else np.array([], dtype=object),
+        "match": match,
+    }
+
+
+def load_feature_intervals(organism, measurement_type="chromatin_accessibility"):
+    """Parse genomic coordinates from feature names into per-chromosome sorted arrays"""
+    names = pd.Series(get_feature_names(organism, measurement_type=measurement_type))
+    coords = names.str.extract(region_regex).dropna()
+    coords["start"] = coords["start"].astype(np.int64)
+    coords["end"] = coords["end"].astype(np.int64)
+    coords["chromosome"] = coords["chromosome"].str.lower()
+
+    intervals = {}
+    for chromosome, coords_chrom in coords.groupby("chromosome"):
+        coords_chrom = coords_chrom.sort_values("start", kind="stable")
+        intervals[chromosome] = {
+            "starts": coords_chrom["start"].values,
+            "ends": coords_chrom["end"].values,
+            "rows": coords_chrom.index.values,
+            "max_length": int((coords_chrom["end"] - coords_chrom["start"]).max()),
+        }
+    feature_intervals[(organism, measurement_type)] = intervals
+
+
+def get_features_in_region(
+    organism,
+    region,
+    measurement_type="chromatin_accessibility",
+):
+    """Get features (e.g. peaks) overlapping a genomic region such as chr1:1000-2000.
+
+    Coordinates are inclusive on both ends. Features are returned in genomic order.
+    """
+    match = re.match(region_regex, region.replace(",", "").strip())
+    if match is None:
+        raise RegionFormatError(
+            f"Region not understood, use chromosome:start-end: {region}",
+            region=region,
+        )
+    chromosome = match.group("chromosome").lower()
+    start, end = int(match.group("start")), int(match.group("end"))
+    if start > end:
+        raise RegionFormatError(
+            f"Region start is after its end: {region}",
+            region=region,
+        )
+
+    if (organism, measurement_type) not in feature_intervals:
+        load_feature_intervals(organism, measurement_type)
+    intervals = feature_intervals[(organism, measurement_type)]
+
+    # Accept both "chr1" and "1"
+    if chromosome not in intervals:
+        if chromosome.startswith("chr"):
+            chromosome = chromosome[3:]
+        else:
+            chromosome = "chr" + chromosome
+    if chromosome not in intervals:
+        raise FeatureNotFoundError(
+            f"No features found in region: {region}",
+            feature=region,
+        )
+    intervals = intervals[chromosome]
+
+    # Peaks starting after the region or ending before it cannot overlap, and no peak
+    # starts earlier than start - max_length and still reaches the region
+    idx_start = np.searchsorted(intervals["starts"], start - intervals["max_length"], side="left")
+    idx_end = np.searchsorted(intervals["starts"], end, side="right")
+    overlaps = intervals["ends"][idx_start: idx_end] >= start
+    rows = intervals["rows"][idx_start: idx_end][overlaps]
+    if len(rows) == 0:
+        raise FeatureNotFoundError(
+            f"No features found in region: {region}",
+            feature=region,
+        )
+
+    features = get_feature_names(organism, measurement_type=measurement_type)
+    return list(features[rows])
@@ -1,7 +1,7 @@
 """Module for highest expressors"""
-import numpy as np
-import pandas as pd
+from lazy import lazy_import
 
+from metrics import observe_model
 from models.exceptions import (
     OrganismNotFoundError,
     MeasurementTypeNotFoundError,
@@ -18,7 +18,11 @@ from models.measurement import (
     get_fraction_detected,
 )
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
+
+@observe_model
 def get_highest_measurement(
     organism,
     feature,
@@ -117,6 +121,7 @@ def get_highest_measurement(
     return result
 
 
+@observe_model
 def get_highest_measurement_multiple(
     organism,
     features,
@@ -1,51 +1,187 @@
-import numpy as np
-import pandas as pd
-import h5py
-import hdf5plugin
+import threading
 
+from lazy import lazy_import
+
+from metrics import observe_model
 from models.paths import get_protein_embeddings_path
 from models.exceptions import OrganismNotFoundError, FeaturesNotPairedError
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+h5py = lazy_import("h5py")
+
+
+# Merged PROST embeddings for all organisms, loaded lazily once. Embeddings are kept in
+# their stored (quantised) format and only scaled to floats in small blocks when
+# computing distances, so the whole index stays small enough to sit in RAM. The index is
+# built aside and published in one assignment, so concurrent requests never see it half
+# loaded.
+prost_embeddings = None
+prost_embeddings_lock = threading.Lock()
+
+# Number of target embeddings converted to floats at a time when scanning the index
+block_size = 8192
+
+
+def load_prost_embeddings():
+    """Load all PROST embeddings into a single matrix, with per-organism offsets."""
+    global prost_embeddings
+
+    # Needed for compressed datasets
+    import hdf5plugin
 
-def _get_prost_embeddings(organism=None, features=None):
-    """Get embeddings for everything or specific organisms/features."""
     fn_embeddings = get_protein_embeddings_path()
     with h5py.File(fn_embeddings) as h5:
-        if organism is None:
-            raise NotImplementedError("Merging of all embeddings not implemented yet.")
-
-        if organism not in h5:
-            raise OrganismNotFoundError(
-                f"Organism not found: {organism}",
-                organism=organism,
-            )
-
-        group = h5[organism]
-        index = group["features"].asstr()[:]
-        if features is None:
-            embeddings = group["embeddings"][:, :]
-            return {
-                "features": index,
-                "embeddings": embeddings.astype("f4") / 256.0,
-            }
-
-        # Increasing, numerical indices for the selected features
-        idx_features = pd.Series(index, index=np.arange(len(index)))
-        idx_features = idx_features[idx_features.isin(features)].index
-        if len(idx_features) == 0:
-            return {
-                "features": [],
-                "embeddings": [],
-            }
-
-        features_found = index[idx_features]
-        embeddings_found = group["embeddings"][idx_features, :]
+        organisms = sorted(h5.keys())
+        features = []
+        embeddings = []
+        for organism in organisms:
+            group = h5[organism]
+            features.append(group["features"].asstr()[:])
+            embeddings.append(group["embeddings"][:, :])
+
+    nfeatures = [len(fea) for fea in features]
+    offsets = np.concatenate([[0], np.cumsum(nfeatures)])
+    index = {
+        "organisms": organisms,
+        "offsets": dict(zip(organisms, zip(offsets[:-1], offsets[1:]))),
+        "organism_codes": np.repeat(np.arange(len(organisms), dtype=np.int32), nfeatures),
+        "features": np.concatenate(features),
+        "embeddings": np.concatenate(embeddings, axis=0),
+    }
+
+    # Hash index from feature name to row in the merged matrix, for each organism
+    index["rows"] = {}
+    for organism, features_organism in zip(organisms, features):
+        start = index["offsets"][organism][0]
+        rows = pd.Series(np.arange(start, start + len(features_organism)), index=features_organism)
+        index["rows"][organism] = rows[~rows.index.duplicated()]
+
+    prost_embeddings = index
+    return index
+
+
+def get_prost_embeddings():
+    """Get the merged index of PROST embeddings, loading it on first use."""
+    index = prost_embeddings
+    if index is None:
+        with prost_embeddings_lock:
+            # Another thread may have loaded it while this one was waiting
+            index = prost_embeddings
+            if index is None:
+                index = load_prost_embeddings()
+    return index
+
+
+def _get_prost_index(organism=None):
+    """Get features and raw embeddings for one organism (or all), as views on the index."""
+    index = get_prost_embeddings()
+
+    if organism is None:
+        return {
+            "features": index["features"],
+            "embeddings": index["embeddings"],
+            "organism_codes": index["organism_codes"],
+        }
+
+    if organism not in index["offsets"]:
+        raise OrganismNotFoundError(
+            f"Organism not found: {organism}",
+            organism=organism,
+        )
+
+    start, end = index["offsets"][organism]
+    return {
+        "features": index["features"][start:end],
+        "embeddings": index["embeddings"][start:end],
+        "organism_codes": index["organism_codes"][start:end],
+    }
+
+
+def _get_prost_rows(organism, features):
+    """Get the rows of the merged index for features of one organism (-1 if not found)."""
+    index = get_prost_embeddings()
+
+    if organism not in index["rows"]:
+        raise OrganismNotFoundError(
+            f"Organism not found: {organism}",
+            organism=organism,
+        )
+
+    rows = index["rows"][organism]
+    idx = rows.index.get_indexer(features)
+    # Only gather found positions: an organism may have no rows at all
+    found = idx >= 0
+    out = np.full(len(idx), -1, dtype=np.int64)
+    out[found] = rows.values[idx[found]]
+    return out
+
+
+def _get_prost_embeddings(organism=None, features=None):
+    """Get embeddings for everything or specific organisms/features."""
+    index = _get_prost_index(organism)
+    if features is None:
+        return {
+            "features": index["features"],
+            "embeddings": index["embeddings"].astype("f4") / 256.0,
+        }
+
+    # Increasing, numerical indices for the selected features
+    rows = _get_prost_rows(organism, features)
+    rows = np.unique(rows[rows >= 0])
+    if len(rows) == 0:
         return {
-            "features": features_found,
-            "embeddings": embeddings_found.astype("f4") / 256.0,
+            "features": [],
+            "embeddings": [],
         }
 
+    index = get_prost_embeddings()
+    return {
+        "features": index["features"][rows],
+        "embeddings": index["embeddings"][rows].astype("f4") / 256.0,
+    }
+
+
+def _get_close_targets(embeddings_target, embeddings_queries, max_distance, skip=None):
+    """Find raw target embeddings within L1 distance of each query embedding.
 
+    Targets are scaled to floats one block at a time and only hits are kept, so memory
+    stays bounded even when scanning the embeddings of all organisms at once.
+
+    Args:
+        skip: Optional (start, end) range of targets that are not scanned at all.
+
+    Returns:
+        list with one (target indices, distances) tuple per query.
+    """
+    ntargets = len(embeddings_target)
+    if skip is None:
+        spans = [(0, ntargets)]
+    else:
+        spans = [(0, skip[0]), (skip[1], ntargets)]
+
+    hits = [([], []) for embedding in embeddings_queries]
+    for span_start, span_end in spans:
+        for start in range(span_start, span_end, block_size):
+            end = min(start + block_size, span_end)
+            block = embeddings_target[start:end].astype("f4") / 256.0
+            for embedding, (idx_hits, dis_hits) in zip(embeddings_queries, hits):
+                # PROST requires L1 distance
+                dis = np.abs(block - embedding).sum(axis=1)
+                idx = (dis < max_distance).nonzero()[0]
+                idx_hits.append(idx + start)
+                dis_hits.append(dis[idx])
+
+    return [
+        (
+            np.concatenate(idx_hits) if idx_hits else np.array([], dtype=int),
+            np.concatenate(dis_hits) if dis_hits else np.array([], dtype="f4"),
+        )
+        for idx_hits, dis_hits in hits
+    ]
+
+
+@observe_model
 def get_homologs(
     query_organism,
     query_features,
@@ -53,94 +189,106 @@ def get_homologs(
     max_distance=60,
     max_distance_over_min=8,
 ):
-    """Get homologous features across species using PROST protein embeddings."""
+    """Get homologous features across species using PROST protein embeddings.
+
+    If target_organism is "all", homologs are searched in every organism except the
+    query one, and the closest hits are selected separately within each organism.
+    """
     emb_queries = _get_prost_embeddings(
         organism=query_organism, features=query_features
     )
-    emb_target = _get_prost_embeddings(organism=target_organism)
+    search_all = target_organism == "all"
+    if search_all:
+        index = get_prost_embeddings()
+        emb_target = _get_prost_index()
+        organisms = np.array(index["organisms"])
+        # The query organism occupies a contiguous range of the index, left out of the scan
+        skip = index["offsets"][query_organism]
+    else:
+        emb_target = _get_prost_index(target_organism)
+        skip = None
 
     result = {
         "queries": [],
         "targets": [],
         "distances": [],
     }
-    for feature, embedding in zip(emb_queries["features"], emb_queries["embeddings"]):
-        # PROST requires L1 distance
-        dis = np.abs((emb_target["embeddings"] - embedding)).sum(axis=1)
+    if search_all:
+        result["target_organisms"] = []
+    if len(emb_queries["features"]) == 0:
+        return result
 
-        # Identify all features within distance
-        idx_homologs = (dis < max_distance).nonzero()[0]
+    # Identify all features within distance
+    hits = _get_close_targets(
+        emb_target["embeddings"], emb_queries["embeddings"], max_distance, skip=skip,
+    )
+
+    for feature, (idx_homologs, dis_homologs) in zip(emb_queries["features"], hits):
         if len(idx_homologs) == 0:
             continue
-        homologs = emb_target["features"][idx_homologs]
-        dis_homologs = dis[idx_homologs]
 
-        # Restrict to closest and similia
-        min_distance = dis_homologs.min()
-        idx_homologs = dis_homologs <= max_distance_over_min + min_distance
-        homologs = homologs[idx_homologs]
-        dis_homologs = dis_homologs[idx_homologs]
+        # Restrict to closest and similia (within each target organism)
+        if search_all:
+            codes = emb_target["organism_codes"][idx_homologs]
+            min_distance = pd.Series(dis_homologs).groupby(codes).transform("min").values
+        else:
+            min_distance = dis_homologs.min()
+        idx_close = dis_homologs <= max_distance_over_min + min_distance
+        idx_homologs = idx_homologs[idx_close]
+        dis_homologs = dis_homologs[idx_close]
+        homologs = emb_target["features"][idx_homologs]
 
         # Append to matches
-        for homolog, dis_homolog in zip(homologs, dis_homologs):
-            result["queries"].append(feature)
-            result["targets"].append(homolog)
-            result["distances"].append(float(dis_homolog))
+        result["queries"].extend([feature] * len(homologs))
+        result["targets"].extend(homologs.tolist())
+        result["distances"].extend(dis_homologs.astype(float).tolist())
+        if search_all:
+            codes = emb_target["organism_codes"][idx_homologs]
+            result["target_organisms"].extend(organisms[codes].tolist())
     return result
 
 
+@observe_model
 def get_homology_distances(
     query_organism,
     query_features,
     target_organism,
     target_features,
 ):
-    """Get homology distance between two sets of features."""
+    """Get homology distance between two sets of features.
+
+    Returns:
+        dict with "queries", "targets", and "distances" as paired numpy arrays, for the
+        pairs in which both features have an embedding.
+    """
 
     if len(query_features) != len(target_features):
         raise FeaturesNotPairedError(
-            message="The number of query and target features must be equal.",
+            "The number of query and target features must be equal.",
             features1=query_features,
             features2=target_features,
         )
 
-    emb_queries = _get_prost_embeddings(
-        organism=query_organism, features=query_features
-    )
-    emb_targets = _get_prost_embeddings(
-        organism=target_organism,
-        features=target_features,
-    )
-    found_queries = pd.Index(query_features).isin(emb_queries["features"])
-    found_targets = pd.Index(target_features).isin(emb_targets["features"])
-    found_both = found_queries & found_targets
-
-    query_features_found = np.array(query_features)[found_both]
-    target_features_found = np.array(target_features)[found_both]
-
-    # NOTE: the subfunction returns deduplicated features, so we need to realign them here
-    emb_queries_dup = []
-    emb_targets_dup = []
-    for fea in query_features_found:
-        # There is always only one match
-        idx = emb_queries["features"] == fea
-        emb_queries_dup.append(emb_queries["embeddings"][idx][0])
-    for fea in target_features_found:
-        idx = emb_targets["features"] == fea
-        emb_targets_dup.append(emb_targets["embeddings"][idx][0])
-
-    emb_queries_dup = np.array(emb_queries_dup)
-    emb_targets_dup = np.array(emb_targets_dup)
-
-    # PROST requires L1 distance
-    dis = np.abs(emb_queries_dup - emb_targets_dup).sum(axis=1)
-
-    result = pd.DataFrame(
-        {
-            "queries": query_features_found,
-            "targets": target_features_found,
-            "distances": dis,
-        }
-    )
+    rows_queries = _get_prost_rows(query_organism, query_features)
+    rows_targets = _get_prost_rows(target_organism, target_features)
+    found_both = (rows_queries >= 0) & (rows_targets >= 0)
+    rows_queries = rows_queries[found_both]
+    rows_targets = rows_targets[found_both]
+
+    # PROST requires L1 distance. Gather both sides of each pair straight from the
+    # merged index, in blocks to keep memory bounded for very many pairs
+    embeddings = get_prost_embeddings()["embeddings"]
+    dis = np.empty(len(rows_queries), dtype="f4")
+    for start in range(0, len(dis), block_size):
+        end = start + block_size
+        block_queries = embeddings[rows_queries[start:end]].astype("f4")
+        block_targets = embeddings[rows_targets[start:end]].astype("f4")
+        dis[start:end] = np.abs(block_queries - block_targets).sum(axis=1) / 256.0
+
+    result = {
+        "queries": np.asarray(query_features)[found_both],
+        "targets": np.asarray(target_features)[found_both],
+        "distances": dis,
+    }
 
     return result
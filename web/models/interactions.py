@@ -1,35 +1,333 @@
-import pandas as pd
+"""Cell-cell interactions (e.g. ligand-receptor pairs)"""
+import os
 
+from lazy import lazy_import
+
+from metrics import observe_model
 from models.paths import (
     get_interactions_path,
 )
+from models.exceptions import (
+    MeasurementTypeNotFoundError,
+    OrganCellTypeError,
+)
+from models.features import get_feature_names
+from models.measurement import get_measurement
+from models.celltypes import get_celltype_index
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+# This dict has organisms as keys and interaction graphs as values. Each graph is a
+# dict with the file modification time (to reload if the table changes), the gene
+# names, a gene -> index dict, and a symmetric adjacency in CSR format (indptr and
+# indices arrays): the partners of gene i are genes[indices[indptr[i]: indptr[i + 1]]].
+# The original directed (source -> target) edges are kept as well, for scoring.
+interaction_graphs = {}
+
+# Number of interactions scored at a time, to bound memory with many cell types
+block_size = 1024
+
+
+def load_interaction_graph(organism):
+    """Parse the interaction table of an organism into a symmetric CSR adjacency."""
+    interaction_path = get_interactions_path(organism)
+    mtime = os.stat(interaction_path).st_mtime
+    table = pd.read_csv(
+        interaction_path,
+        sep='\t',
+        compression='gzip',
+        usecols=['source_gene', 'target_gene'],
+    )
+
+    # Interactions are undirected for partner lookups, so add each edge both ways
+    codes, genes = pd.factorize(
+        np.concatenate([table['source_gene'].values, table['target_gene'].values]),
+    )
+    nedges = len(table)
+    ngenes = len(genes)
+    edges_directed = np.unique(codes[:nedges].astype(np.int64) * ngenes + codes[nedges:])
+    sources, targets = np.divmod(edges_directed, ngenes)
+
+    rows = np.concatenate([codes[:nedges], codes[nedges:]])
+    cols = np.concatenate([codes[nedges:], codes[:nedges]])
+
+    # Sort by row, then by column, and drop duplicate edges
+    edges = np.unique(rows.astype(np.int64) * ngenes + cols)
+    rows, cols = np.divmod(edges, ngenes)
+    indptr = np.zeros(ngenes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=ngenes), out=indptr[1:])
+
+    genes = np.asarray(genes, dtype=object)
+    interaction_graphs[organism] = {
+        'mtime': mtime,
+        'genes': genes,
+        'gene_index': {gene: i for i, gene in enumerate(genes)},
+        'indptr': indptr,
+        'indices': cols.astype(np.int32),
+        'sources': sources.astype(np.int32),
+        'targets': targets.astype(np.int32),
+    }
+
 
+def get_interaction_graph(organism):
+    """Get the cached interaction graph of an organism, reloading it if the file changed."""
+    graph = interaction_graphs.get(organism, None)
+    if graph is None:
+        load_interaction_graph(organism)
+    else:
+        mtime = os.stat(get_interactions_path(organism)).st_mtime
+        if mtime != graph['mtime']:
+            load_interaction_graph(organism)
+    return interaction_graphs[organism]
 
 
+def _get_gene_features(graph, organism, measurement_type):
+    """Get the feature index in the atlas of each gene in the graph (-1 if not measured)."""
+    features = get_feature_names(organism, measurement_type=measurement_type)
+    feature_rows = pd.Series(np.arange(len(features)), index=features)
+    feature_rows = feature_rows[~feature_rows.index.duplicated()]
+    idx = feature_rows.index.get_indexer(graph['genes'])
+    return np.where(idx >= 0, feature_rows.values[idx], -1)
+
+
+def _get_expressed_genes(
+    graph,
+    organism,
+    organ,
+    cell_type,
+    min_fraction,
+    measurement_type,
+):
+    """Get a boolean mask of genes in the graph that are expressed in an organ/cell type."""
+    from models import get_celltypes
+
+    fractions = get_measurement(
+        organism,
+        features=None,
+        organ=organ,
+        measurement_type=measurement_type,
+        measurement_subtype="fraction",
+    )
+    if cell_type is not None:
+        celltypes = get_celltypes(organism, organ, measurement_type=measurement_type)
+        idx = get_celltype_index(cell_type, celltypes)["index"]
+        fractions = fractions[idx]
+    else:
+        fractions = fractions.max(axis=0)
+
+    gene_features = _get_gene_features(graph, organism, measurement_type)
+    measured = gene_features >= 0
+    expressed = np.zeros(len(gene_features), bool)
+    expressed[measured] = fractions[gene_features[measured]] >= min_fraction
+    return expressed
+
+
+@observe_model
 def get_interaction_partners(
     organism,
     features,
     measurement_type="gene_expression",
+    depth=1,
+    max_nodes=None,
+    organ=None,
+    cell_type=None,
+    min_fraction=0.1,
     ):
-    
+    """Get the interaction partners of a list of features.
+
+    Args:
+        depth: Number of hops from the queried features. Partners of partners are found
+            by a breadth-first traversal of the interaction graph.
+        max_nodes: If not None, stop adding partners once the neighbourhood (including
+            the queried features) has this many features.
+        organ: If not None, only keep (and traverse through) partners that are detected
+            in at least min_fraction of the cells of some cell type in this organ.
+        cell_type: If not None, restrict the organ filter to this cell type.
+
+    Returns:
+        dict with paired lists "queries" and "targets", one entry per interaction found.
+        If depth is more than one, the "depths" list contains the number of hops from the
+        queried features to each target.
+    """
     if measurement_type != "gene_expression":
         raise MeasurementTypeNotFoundError(
             "Interactions are only available for gene expression at the moment.",
             measurement_type=measurement_type,
         )
+    if (cell_type is not None) and (organ is None):
+        raise OrganCellTypeError("Filtering by cell type requires an organ.")
+
+    graph = get_interaction_graph(organism)
+    genes = graph['genes']
+    indptr = graph['indptr']
+    indices = graph['indices']
+    gene_index = graph['gene_index']
+
+    if organ is not None:
+        expressed = _get_expressed_genes(
+            graph, organism, organ, cell_type, min_fraction, measurement_type,
+        )
+    else:
+        expressed = np.ones(len(genes), bool)
+
+    # Hops from the queried features, -1 for genes not reached yet
+    depths = np.full(len(genes), -1)
+    frontier = np.array(
+        [gene_index[fea] for fea in features if fea in gene_index], dtype=np.int64,
+    )
+    depths[frontier] = 0
+    nnodes = len(np.unique(frontier))
 
-    interaction_path = get_interactions_path(organism)
-    table = pd.read_csv(interaction_path, sep='\t', compression='gzip')
-    targets = []
     queries = []
-    for feature in features:
-        partners = list(table.loc[table['source_gene'] == feature, 'target_gene'].values)
-        partners += list(table.loc[table['target_gene'] == feature, 'source_gene'].values)
-        partners = list(set(partners))
-        targets.extend(partners)
-        queries.extend([feature] * len(partners))
-    
-    return {
+    targets = []
+    edge_depths = []
+    for hop in range(1, depth + 1):
+        if len(frontier) == 0:
+            break
+
+        # Gather all edges out of the frontier from the CSR ranges
+        starts = indptr[frontier]
+        lengths = indptr[frontier + 1] - starts
+        sources = np.repeat(frontier, lengths)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        partners = indices[offsets + np.arange(lengths.sum())]
+
+        # Keep edges to new genes, or between genes at the same depth. The latter are
+        # only reported once (except for direct partners of queried features)
+        depths_partners = depths[partners]
+        keep = expressed[partners] & (
+            (depths_partners == -1)
+            | ((depths_partners == hop - 1) & ((hop == 1) | (partners > sources)))
+        )
+        sources = sources[keep]
+        partners = partners[keep]
+
+        # Add new genes in order of discovery, up to max_nodes
+        new = depths[partners] == -1
+        new_nodes = pd.unique(partners[new])
+        if max_nodes is not None:
+            new_nodes = new_nodes[:max(max_nodes - nnodes, 0)]
+            keep = ~new | np.isin(partners, new_nodes)
+            sources = sources[keep]
+            partners = partners[keep]
+        depths[new_nodes] = hop
+        nnodes += len(new_nodes)
+
+        queries.extend(genes[sources])
+        targets.extend(genes[partners])
+        edge_depths.extend([hop] * len(partners))
+        frontier = new_nodes
+
+    result = {
         'targets': targets,
         'queries': queries,
     }
+    if depth > 1:
+        result['depths'] = edge_depths
+    return result
+
+
+@observe_model
+def get_interaction_scores(
+    organism,
+    organ,
+    number=50,
+    min_fraction=0.1,
+    measurement_type="gene_expression",
+):
+    """Score known interactions between all pairs of cell types within an organ.
+
+    The score of an interaction (source gene -> target gene) from a sender to a receiver
+    cell type is the product of the average expression of the source gene in the sender
+    and of the target gene in the receiver. Genes detected in fewer than min_fraction of
+    the cells of a type do not contribute.
+
+    Returns:
+        dict with the top scoring interactions, sorted by decreasing score, as paired
+        lists: "sources", "targets", "source_celltypes", "target_celltypes", "scores".
+    """
+    from models import get_celltypes
+
+    if measurement_type != "gene_expression":
+        raise MeasurementTypeNotFoundError(
+            "Interactions are only available for gene expression at the moment.",
+            measurement_type=measurement_type,
+        )
+
+    celltypes = np.asarray(get_celltypes(
+        organism,
+        organ,
+        measurement_type=measurement_type,
+    ))
+    graph = get_interaction_graph(organism)
+
+    # Map genes in the interaction graph onto features in the atlas
+    gene_features = _get_gene_features(graph, organism, measurement_type)
+
+    # Only interactions with both genes measured can be scored
+    idx_sources = gene_features[graph['sources']]
+    idx_targets = gene_features[graph['targets']]
+    measured = (idx_sources >= 0) & (idx_targets >= 0)
+    edges = measured.nonzero()[0]
+    idx_sources = idx_sources[measured]
+    idx_targets = idx_targets[measured]
+
+    # Cell types x features, restricted to genes that take part in interactions
+    idx_genes, idx_inverse = np.unique(
+        np.concatenate([idx_sources, idx_targets]), return_inverse=True,
+    )
+    averages = get_measurement(
+        organism,
+        features=None,
+        organ=organ,
+        measurement_type=measurement_type,
+        measurement_subtype="average",
+    )[:, idx_genes]
+    fractions = get_measurement(
+        organism,
+        features=None,
+        organ=organ,
+        measurement_type=measurement_type,
+        measurement_subtype="fraction",
+    )[:, idx_genes]
+    averages[fractions < min_fraction] = 0
+    averages_sources = averages[:, idx_inverse[:len(edges)]]
+    averages_targets = averages[:, idx_inverse[len(edges):]]
+
+    # Scores for each (sender, receiver, interaction) as batched outer products, keeping
+    # a running top list across blocks of interactions
+    ncelltypes = len(celltypes)
+    top_scores = np.zeros(0, dtype=averages.dtype)
+    top_keys = np.zeros((0, 3), dtype=np.int64)
+    for start in range(0, len(edges), block_size):
+        end = min(start + block_size, len(edges))
+        scores = averages_sources[:, None, start:end] * averages_targets[None, :, start:end]
+        scores = scores.ravel()
+        if len(scores) > number:
+            idx_top = np.argpartition(scores, -number)[-number:]
+        else:
+            idx_top = np.arange(len(scores))
+        idx_top = idx_top[scores[idx_top] > 0]
+        keys = np.column_stack(np.unravel_index(idx_top, (ncelltypes, ncelltypes, end - start)))
+        keys[:, 2] += start
+        top_scores = np.concatenate([top_scores, scores[idx_top]])
+        top_keys = np.concatenate([top_keys, keys])
+        if len(top_scores) > number:
+            idx_top = np.argpartition(top_scores, -number)[-number:]
+            top_scores = top_scores[idx_top]
+            top_keys = top_keys[idx_top]
+
+    order = np.argsort(top_scores)[::-1]
+    top_scores = top_scores[order]
+    top_keys = top_keys[order]
+    top_edges = edges[top_keys[:, 2]]
+
+    return {
+        'sources': graph['genes'][graph['sources'][top_edges]].tolist(),
+        'targets': graph['genes'][graph['targets'][top_edges]].tolist(),
+        'source_celltypes': celltypes[top_keys[:, 0]].tolist(),
+        'target_celltypes': celltypes[top_keys[:, 1]].tolist(),
+        'scores': top_scores.astype(float).tolist(),
+    }
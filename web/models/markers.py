@@ -1,6 +1,6 @@
-import numpy as np
-import pandas as pd
+from lazy import lazy_import
 
+from metrics import observe_model
 from models.paths import get_atlas_path
 from models.utils import ApproximationFile
 from models.exceptions import (
@@ -21,6 +21,7 @@ from models.celltypes import (
 )
 from models.quantisation import (
     get_quantisation,
+    undo_quantisation,
 )
 from models.features import (
     get_features,
@@ -31,8 +32,12 @@ from models.surface import (
     get_surface_genes,
 )
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 
+
+@observe_model
 def get_markers_vs_other_celltypes(
     organism,
     organ,
@@ -92,22 +97,16 @@ def get_markers_vs_other_celltypes(
                 targets.extend([ct] * len(markers_ct))
             return markers, targets
 
-        if cell_type not in cell_types:
-            raise CellTypeNotFoundError(
-                f"Cell type not found: {cell_type}",
-                cell_type=cell_type,
-            )
+        # Index cell types (this raises if the cell type is not found)
+        ncell_types = len(cell_types)
+        celltype_index_dict = get_celltype_index(cell_type, cell_types)
+        cell_type = celltype_index_dict["celltype"]
+        idx = celltype_index_dict["index"]
 
         # Matrix of measurements (rows are cell types)
         mat = data[method]
         if surface_only:
             mat = mat[:, surface_ser_sorted.index.values]
-
-        # Index cell types
-        ncell_types = len(cell_types)
-        celltype_index_dict = get_celltype_index(cell_type, cell_types)
-        cell_type = celltype_index_dict["celltype"]
-        idx = celltype_index_dict["index"]
         idx_other = [i for i in range(ncell_types) if i != idx]
 
         vector = mat[idx]
@@ -117,8 +116,8 @@ def get_markers_vs_other_celltypes(
         dequantise = "quantisation" in db['measurements'][measurement_type]
         if dequantise:
             quantisation = get_quantisation(organism, measurement_type)
-            vector = quantisation[vector]
-            mat_other = quantisation[mat_other]
+            vector = undo_quantisation(vector, quantisation)
+            mat_other = undo_quantisation(mat_other, quantisation)
 
     # Compute difference (vector - other)
     mat_other -= vector
@@ -143,6 +142,7 @@ def get_markers_vs_other_celltypes(
     return markers
 
 
+@observe_model
 def get_markers_vs_other_tissues(
     organism,
     organ,
@@ -237,8 +237,8 @@ def get_markers_vs_other_tissues(
         dequantise = "quantisation" in db['measurements'][measurement_type]
         if dequantise:
             quantisation = get_quantisation(organism, measurement_type)
-            vector = quantisation[vector]
-            mat_other = quantisation[mat_other]
+            vector = undo_quantisation(vector, quantisation)
+            mat_other = undo_quantisation(mat_other, quantisation)
 
     # Compute difference (vector - other)
     mat_other -= vector
@@ -1,8 +1,8 @@
 """Module for access to average and fraction_detected."""
-import numpy as np
-import pandas as pd
+from lazy import lazy_import
 
 from config import configuration as config
+from metrics import observe_model
 from models.paths import get_atlas_path
 from models.utils import ApproximationFile
 from models.exceptions import (
@@ -14,12 +14,28 @@ from models.exceptions import (
     OrganCellTypeError,
     OrganNotFoundError,
     NeighborhoodNotFoundError,
+    CellTypeNotFoundError,
 )
 from models.features import (
     get_feature_index,
+    get_feature_indices,
 )
-from models.celltypes import get_celltype_index
-from models.quantisation import get_quantisation
+from models.celltypes import (
+    get_celltype_index,
+    get_celltype_organism_index,
+)
+from models.quantisation import (
+    get_quantisation,
+    undo_quantisation,
+)
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+# Number of features read from the h5 file at a time when streaming. Blocks are rounded
+# to whole chunks of the dataset, so that no chunk is read and decompressed twice
+stream_block_size = 1000
 
 
 def _get_sorted_feature_index(
@@ -102,6 +118,12 @@ def _collate_measurement_across_organs(
 ):
     from models import get_celltype_location, get_celltypes
 
+    # Correct typos and aliases once against all cell types of the organism
+    cell_type = get_celltype_organism_index(
+        organism,
+        cell_type,
+        measurement_type=measurement_type,
+    )["celltype"]
     organs = get_celltype_location(
         organism,
         cell_type,
@@ -141,6 +163,7 @@ def _collate_measurement_across_organs(
     return avgs
 
 
+@observe_model
 def get_measurement(
     organism,
     features,
@@ -203,8 +226,131 @@ def get_measurement(
     # might involve opening the same file again
     if dequantise:
         quantisation = get_quantisation(organism, measurement_type)
-        result = quantisation[result]
+        result = undo_quantisation(result, quantisation)
+
+    return result
+
+
+def iter_measurement(
+    organism,
+    features,
+    measurement_type,
+    measurement_subtypes,
+    organ=None,
+    cell_type=None,
+):
+    """Iterate over measurements for any number of features, in blocks.
+
+    Unlike get_measurement, the number of features is not capped since only one block
+    is in memory at any time. All inputs are validated before anything is read, so errors
+    are raised by this function rather than during iteration. Blocks follow the order of
+    the features in the h5 file (duplicates are dropped) and each block is read as one
+    slab aligned with the chunks of the dataset.
+
+    Args:
+        measurement_subtypes: list of "average" and/or "fraction".
+
+    Returns:
+        dict with "organ" and "celltypes" (or "celltype" and "organs") and a "blocks"
+        generator of (feature indices, {subtype: 2D array}) tuples. Each 2D array has one
+        row per feature.
+    """
+    from models import get_celltypes, get_celltype_location
+
+    if (organ is None) and (cell_type is None):
+        raise OrganCellTypeError("Either organ or cell type must be specified.")
+    if (organ is not None) and (cell_type is not None):
+        raise OrganCellTypeError("Only one of organ or cell type can be specified.")
+
+    approx_path = get_atlas_path(organism)
+    with ApproximationFile(approx_path) as db:
+        if measurement_type not in db['measurements']:
+            raise MeasurementTypeNotFoundError(
+                f"Measurement type not found: {measurement_type}",
+                measurement_type=measurement_type,
+            )
+        dequantise = "quantisation" in db['measurements'][measurement_type]
+
+    # (organ, cell type index) pairs to read from, None meaning all cell types
+    if organ is not None:
+        celltypes = get_celltypes(organism, organ, measurement_type=measurement_type)
+        sources = [(organ, None)]
+        result = {
+            "organ": organ,
+            "celltypes": list(celltypes),
+        }
+    else:
+        cell_type = get_celltype_organism_index(
+            organism,
+            cell_type,
+            measurement_type=measurement_type,
+        )["celltype"]
+        organs = get_celltype_location(
+            organism,
+            cell_type,
+            measurement_type=measurement_type,
+        )
+        if len(organs) == 0:
+            raise CellTypeNotFoundError(
+                f"Cell type not found: {cell_type}.",
+                cell_type=cell_type,
+            )
+        sources = []
+        for organ_ct in organs:
+            celltypes_organ = list(get_celltypes(
+                organism,
+                organ_ct,
+                measurement_type=measurement_type,
+            ))
+            sources.append((organ_ct, get_celltype_index(cell_type, celltypes_organ)["index"]))
+        result = {
+            "celltype": cell_type,
+            "organs": list(organs),
+        }
+
+    idxs = np.unique(get_feature_indices(
+        organism,
+        [fea.lower() for fea in features],
+        measurement_type=measurement_type,
+    ))
+    quantisation = get_quantisation(organism, measurement_type) if dequantise else None
 
+    # For ATAC-Seq, fraction detected is the same as average
+    dataset_names = {}
+    for subtype in measurement_subtypes:
+        if measurement_type in ("chromatin_accessibility",):
+            dataset_names[subtype] = "average"
+        else:
+            dataset_names[subtype] = subtype
+
+    def generator():
+        with ApproximationFile(approx_path) as db:
+            group = db['measurements'][measurement_type]["data"]['tissue->celltype']
+            chunks = group[sources[0][0]]["average"].chunks
+            chunk_width = 1 if chunks is None else chunks[1]
+            block_size = max(stream_block_size // chunk_width, 1) * chunk_width
+
+            bounds = np.flatnonzero(np.diff(idxs // block_size)) + 1
+            for idxs_block in np.split(idxs, bounds):
+                if len(idxs_block) == 0:
+                    continue
+                start, end = idxs_block[0], idxs_block[-1] + 1
+                data = {}
+                for subtype, dataset_name in dataset_names.items():
+                    values = []
+                    for organ_source, celltype_index in sources:
+                        dataset = group[organ_source][dataset_name]
+                        if celltype_index is None:
+                            values.append(dataset[:, start:end])
+                        else:
+                            values.append(dataset[celltype_index: celltype_index + 1, start:end])
+                    values = np.vstack(values)[:, idxs_block - start].T
+                    if quantisation is not None:
+                        values = undo_quantisation(values, quantisation)
+                    data[subtype] = values
+                yield idxs_block, data
+
+    result["blocks"] = generator()
     return result
 
 
@@ -267,6 +413,7 @@ def get_fraction_detected(
     )
 
 
+@observe_model
 def get_neighborhoods(
     organism,
     organ,
@@ -18,6 +18,29 @@ def get_atlas_path(organism):
     return approx_path
 
 
+# File suffixes of precompressed copies of atlases, by HTTP content coding
+precompressed_suffixes = {
+    "zstd": ".zst",
+    "br": ".br",
+    "gzip": ".gz",
+}
+
+
+def get_precompressed_atlas_paths(organism):
+    """Get precompressed copies of an atlas (e.g. h_sapiens.h5.zst) by content coding.
+
+    Copies older than the atlas itself are ignored, since they are out of date.
+    """
+    approx_path = get_atlas_path(organism)
+    mtime = approx_path.stat().st_mtime
+    paths = {}
+    for encoding, suffix in precompressed_suffixes.items():
+        path = approx_path.with_name(approx_path.name + suffix)
+        if path.exists() and (path.stat().st_mtime >= mtime):
+            paths[encoding] = path
+    return paths
+
+
 def get_interactions_path(organism):
     """Get the file path for a set of interactions."""
     interaction_folder = pathlib.Path(config["paths"]["interactions"])
@@ -35,4 +35,6 @@ def get_quantisation(organism, measurement_type):
     return quantisations[(organism, measurement_type)]
 
 
-
+def undo_quantisation(data, quantisation):
+    """Map quantised data (integer codes) back to real values."""
+    return quantisation[data]
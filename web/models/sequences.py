@@ -1,8 +1,10 @@
 """Feature sequences (e.g. genes, transcripts, peaks)"""
+from lazy import lazy_import
+
 from config import configuration as config
 from models.paths import get_atlas_path
 from models.utils import ApproximationFile
-from models.features import get_feature_index
+from models.features import get_feature_indices
 from models.exceptions import (
     FeatureSequencesNotFoundError,
     FeatureNotFoundError,
@@ -10,13 +12,27 @@ from models.exceptions import (
     MeasurementTypeNotFoundError,
 )
 
+np = lazy_import("numpy")
 
-def get_feature_sequences(
+
+# Number of sequences read from the h5 file at a time
+block_size = 1000
+
+
+def iter_feature_sequences(
     organism,
     features,
     measurement_type="gene_expression",
 ):
-    """Get the sequences of a list of features."""
+    """Iterate over the sequences of a list of features, in blocks.
+
+    All features are validated before anything is read, so errors are raised by this
+    function rather than during iteration. Each block of features is sorted and read
+    from the h5 file in one go, then put back in the requested order.
+
+    Returns:
+        sequence type (e.g. "protein") and a generator of (feature, sequence) tuples.
+    """
     approx_path = get_atlas_path(organism)
     with ApproximationFile(approx_path) as db:
         if measurement_type not in db['measurements']:
@@ -29,28 +45,37 @@ def get_feature_sequences(
                 "Feature sequences not found",
                 organism=organism,
             )
-
         sequence_type = db['measurements'][measurement_type]["feature_sequences"].attrs["type"]
-        sequences = []
-        features_not_found = []
-        for fea in features:
-            try:
-                idx = get_feature_index(organism, fea.lower(), measurement_type)
-            except FeatureNotFoundError as exc:
-                features_not_found.append(fea)
-                continue
-
-            # If there are features not found, don't bother collecting sequences anymore
-            if len(features_not_found):
-                continue
-
-            seq = db['measurements'][measurement_type]["feature_sequences"]["sequences"].asstr()[idx]
-            sequences.append(seq)
-
-        if len(features_not_found):
-            raise SomeFeaturesNotFoundError(
-                f"Some features not found: {features}",
-                features=features_not_found,
-            )
 
+    idxs = np.asarray(get_feature_indices(
+        organism,
+        [fea.lower() for fea in features],
+        measurement_type=measurement_type,
+    ))
+
+    def generator():
+        with ApproximationFile(approx_path) as db:
+            dataset = db['measurements'][measurement_type]["feature_sequences"]["sequences"]
+            for start in range(0, len(idxs), block_size):
+                idxs_block = idxs[start: start + block_size]
+                # h5py needs increasing, unique indices for fancy indexing
+                idxs_sorted, idx_sort_back = np.unique(idxs_block, return_inverse=True)
+                sequences = dataset.asstr()[idxs_sorted][idx_sort_back]
+                yield from zip(features[start: start + block_size], sequences)
+
+    return sequence_type, generator()
+
+
+def get_feature_sequences(
+    organism,
+    features,
+    measurement_type="gene_expression",
+):
+    """Get the sequences of a list of features."""
+    sequence_type, sequences = iter_feature_sequences(
+        organism,
+        features,
+        measurement_type=measurement_type,
+    )
+    sequences = [seq for fea, seq in sequences]
     return features, sequences, sequence_type
@@ -1,6 +1,7 @@
 """Similarity between features and cell types"""
-import numpy as np
+from lazy import lazy_import
 
+from metrics import observe_model
 from models.exceptions import (
     CellTypeNotFoundError,
     SimilarityMethodError,
@@ -12,7 +13,10 @@ from models.features import (
 from models.measurement import get_measurement
 from models.celltypes import get_celltype_index
 
+np = lazy_import("numpy")
 
+
+@observe_model
 def get_similar_features(
     organism,
     organ,
@@ -97,6 +101,7 @@ def get_similar_features(
     }
 
 
+@observe_model
 def get_similar_celltypes(
     organism,
     organ,
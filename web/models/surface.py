@@ -1,4 +1,4 @@
-import h5py
+from lazy import lazy_import
 
 from config import configuration as config
 
@@ -6,6 +6,8 @@ from models.exceptions import (
     OrganismNotFoundError,
 )
 
+h5py = lazy_import("h5py")
+
 
 def get_surface_genes(organism):
     """Get the genes that encode for cell surface proteins in an organism."""
@@ -1,5 +1,18 @@
-import h5py
-import hdf5plugin  # needed for compressed chunked data
+import threading
+
+from lazy import lazy_import
+
+from metrics import (
+    get_thread_bytes_read,
+    hdf5_bytes_read,
+    hdf5_opens,
+)
+
+h5py = lazy_import("h5py")
+
+# Number of approximation files open in each thread. Bytes read are only recorded by the
+# outermost one, since nested files are read while it is open too
+open_files = threading.local()
 
 
 class ApproximationFile():
@@ -23,6 +36,13 @@ class ApproximationFile():
         self.mode = mode
 
     def __enter__(self):
+        # Registers the zstd filter for compressed chunked data (imported here to keep
+        # startup fast, after the first call this is just a lookup)
+        import hdf5plugin
+
+        hdf5_opens.inc()
+        depth = getattr(open_files, "count", 0)
+        self.bytes_read_start = get_thread_bytes_read() if depth == 0 else None
         self.handles = [self.file_name]
 
         # NOTE: gzip (or zip) slows down access *considerably*
@@ -32,10 +52,16 @@ class ApproximationFile():
 
         self.handles.append(h5py.File(self.handles[-1], self.mode))
         self.handles = self.handles[1:]
+        open_files.count = depth + 1
         return self.handles[-1]
 
 
     def __exit__(self, *args):
+        open_files.count -= 1
         for handle in self.handles[::-1]:
             handle.close()
         self.handles = []
+
+        # Bytes read by this thread while the file was open
+        if self.bytes_read_start is not None:
+            hdf5_bytes_read.inc(get_thread_bytes_read() - self.bytes_read_start)
@@ -0,0 +1,124 @@
+"""Content hashes of atlas files, used to version cached responses.
+
+Hashing reads a whole atlas, which takes seconds for the largest ones. Hashes are
+therefore computed once per file version (path, size, and modification time) and kept
+both in memory and, if configured, on disk, so restarts and other worker processes
+reuse them. The first request depending on an atlas whose hash is not stored anywhere
+yet (e.g. any request across organisms, which depends on all atlases) waits for it:
+preload_caches (run by gunicorn.conf.py unless PRELOAD_CACHES=0) computes all of them
+before serving instead.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+
+from config import configuration as config
+from models.paths import (
+    get_atlas_path,
+    get_precompressed_atlas_paths,
+)
+
+
+# This dict has atlas paths as keys and (size, modification time, hash) tuples as
+# values, so each file is only read in full again when it changes on disk
+atlas_hashes = {}
+
+# Only one thread hashes at a time, so concurrent first requests do not each read the
+# same atlas
+atlas_hashes_lock = threading.Lock()
+
+# Folder where hashes are stored across restarts and worker processes, if set
+hash_cache_dir = config.get("atlas_hashes", {}).get("cache_dir", None)
+
+# Number of bytes read from an atlas file at a time while hashing
+block_size = 1 << 20
+
+
+def _get_stored_hash_path(path):
+    """Get the path of the file storing the hash of a file on disk."""
+    name = hashlib.blake2b(str(path.resolve()).encode(), digest_size=16).hexdigest()
+    return pathlib.Path(hash_cache_dir) / f"{name}.json"
+
+
+def _load_stored_hash(path, stat):
+    """Get the hash of a file stored on disk, or None if missing or outdated."""
+    try:
+        with open(_get_stored_hash_path(path)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (stored.get("size"), stored.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    return stored.get("hash", None)
+
+
+def _store_hash(path, stat, digest):
+    """Store the hash of a file on disk, replacing any older one atomically."""
+    stored_path = _get_stored_hash_path(path)
+    try:
+        stored_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=stored_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "path": str(path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "hash": digest,
+            }, f)
+        os.replace(tmp_path, stored_path)
+    except OSError:
+        # A read-only or full disk only costs rehashing after a restart
+        pass
+
+
+def _get_file_hash(path):
+    """Get the content hash of a file, recomputing it only if the file changed."""
+    path = pathlib.Path(path)
+    stat = path.stat()
+    cached = atlas_hashes.get(str(path), None)
+    if (cached is not None) and (cached[:2] == (stat.st_size, stat.st_mtime_ns)):
+        return cached[2]
+
+    with atlas_hashes_lock:
+        # Another thread may have hashed this file while this one was waiting
+        cached = atlas_hashes.get(str(path), None)
+        if (cached is not None) and (cached[:2] == (stat.st_size, stat.st_mtime_ns)):
+            return cached[2]
+
+        digest = None
+        if hash_cache_dir is not None:
+            digest = _load_stored_hash(path, stat)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=16)
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(block_size), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            if hash_cache_dir is not None:
+                _store_hash(path, stat, digest)
+
+        atlas_hashes[str(path)] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
+def get_atlas_hash(organism):
+    """Get the content hash of the atlas of an organism."""
+    return _get_file_hash(get_atlas_path(organism))
+
+
+def get_precompressed_atlas_hash(organism, encoding):
+    """Get the content hash of a precompressed copy of an atlas, e.g. with zstd."""
+    return _get_file_hash(get_precompressed_atlas_paths(organism)[encoding])
+
+
+def get_atlases_hash():
+    """Get a combined content hash of all atlases, for queries across organisms."""
+    atlas_folder = pathlib.Path(config["paths"]["compressed_atlas"])
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(atlas_folder.glob("*.h5")):
+        digest.update(path.name.encode())
+        digest.update(_get_file_hash(path).encode())
+    return digest.hexdigest()
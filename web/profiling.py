@@ -0,0 +1,132 @@
+'''
+On-demand profiling of single requests.
+
+If enabled in the configuration, a request carrying the header "X-Profile: <token>" is
+run under cProfile and answered with a JSON report instead of its usual response: time
+spent in HDF5 reads, undoing quantisation, pandas, and serialisation, plus the functions
+taking the most time. If an output folder is configured, the full profile is saved
+there as well and can be inspected with pstats or snakeviz.
+
+NOTE: streamed responses are only profiled until the stream starts.
+'''
+import cProfile
+import datetime
+import hmac
+import json
+import os
+import pathlib
+import pstats
+import time
+
+from flask import g, request, Response
+
+from config import configuration as config
+
+
+profiling_config = config.get("profiling", {})
+
+# Number of functions listed in the report
+ntop = 30
+
+
+def _get_category(filename, function):
+    """Get the category of a function, for the time breakdown."""
+    if ("h5py" in filename) or ("h5py" in function):
+        return "hdf5"
+    if function == "undo_quantisation":
+        return "dequantisation"
+    if "pandas" in filename:
+        return "pandas"
+    if (
+        (f"{os.sep}json{os.sep}" in filename)
+        or filename.endswith("representations.py")
+        or ("msgpack" in filename)
+        or ("msgpack" in function)
+    ):
+        return "serialisation"
+    return None
+
+
+def _get_report(profiler, wall_time):
+    """Summarise a profile into a breakdown by category and a list of top functions."""
+    stats = pstats.Stats(profiler)
+
+    breakdown = {
+        "hdf5": 0.0,
+        "dequantisation": 0.0,
+        "pandas": 0.0,
+        "serialisation": 0.0,
+    }
+    top = []
+    for (filename, lineno, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        category = _get_category(filename, function)
+        if category is not None:
+            breakdown[category] += tottime
+        top.append({
+            "function": function,
+            "file": f"{filename}:{lineno}",
+            "ncalls": ncalls,
+            "tottime": tottime,
+            "cumtime": cumtime,
+        })
+    breakdown["other"] = max(stats.total_tt - sum(breakdown.values()), 0)
+    top.sort(key=lambda x: x["tottime"], reverse=True)
+
+    return {
+        "wall_time": wall_time,
+        "profiled_time": stats.total_tt,
+        "breakdown": breakdown,
+        "top": top[:ntop],
+    }
+
+
+def _is_requested():
+    """Check whether the current request asks to be profiled, with the right token."""
+    if not profiling_config.get("enabled", False):
+        return False
+    token = profiling_config.get("token", "")
+    header = request.headers.get("X-Profile", None)
+    if (not token) or (header is None):
+        return False
+    return hmac.compare_digest(header.encode(), token.encode())
+
+
+def start_profiler():
+    """Start profiling the request if asked to (Flask before_request hook)."""
+    if not _is_requested():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already running in this process
+        return
+    g.profiler = profiler
+    g.profiler_start = time.perf_counter()
+
+
+def stop_profiler(response):
+    """Stop profiling and answer with the report instead (Flask after_request hook)."""
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    wall_time = time.perf_counter() - g.pop("profiler_start")
+
+    report = _get_report(profiler, wall_time)
+    report.update({
+        "path": request.full_path,
+        "status": response.status_code,
+    })
+
+    output_dir = profiling_config.get("output_dir", None)
+    if output_dir:
+        output_dir = pathlib.Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        endpoint = request.path.strip("/").replace("/", "_")
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        profile_path = output_dir / f"{timestamp}-{endpoint}.prof"
+        profiler.dump_stats(profile_path)
+        report["profile_file"] = str(profile_path)
+
+    return Response(json.dumps(report) + "\n", mimetype="application/json")
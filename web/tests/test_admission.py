@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+
+
+def test_concurrent_markers(host):
+    """Markers of single cell types are cheap, so concurrent ones are never turned away."""
+    celltypes = ["fibroblast", "macrophage", "B", "T", "alveolar type II", "endothelial"]
+
+    def get(celltype):
+        response = requests.get(
+            f"{host}/markers",
+            params={
+                "organism": "m_musculus",
+                "organ": "Lung",
+                "celltype": celltype,
+                "number": 3,
+            },
+        )
+        return response.status_code
+
+    with ThreadPoolExecutor(len(celltypes)) as pool:
+        statuses = list(pool.map(get, celltypes))
+
+    assert statuses == [200] * len(celltypes)
+
+
+def test_too_many_expensive_requests(host):
+    """A burst of expensive requests is partly turned away, with a Retry-After header."""
+    def get(number):
+        # Different numbers of markers, so responses are neither cached nor shared
+        return requests.get(
+            f"{host}/markers",
+            params={
+                "organism": "m_musculus",
+                "organ": "Lung",
+                "celltype": "all",
+                "number": number,
+            },
+        )
+
+    with ThreadPoolExecutor(32) as pool:
+        responses = list(pool.map(get, range(1, 33)))
+
+    assert {response.status_code for response in responses} <= {200, 429}
+    rejected = [response for response in responses if response.status_code == 429]
+    if not rejected:
+        pytest.skip("The server had enough workers to admit every request")
+
+    for response in rejected:
+        retry_after = int(response.headers["Retry-After"])
+        assert retry_after >= 1
+        resp_content = response.json()
+        assert resp_content["error"]["type"] == "too_many_requests"
+        assert resp_content["error"]["lane"] == "expensive"
+        assert resp_content["error"]["retry_after"] == retry_after
+
+
+def test_too_many_expensive_posts(host):
+    """POST requests are costed from their JSON body, so long feature lists are limited."""
+    features = requests.get(
+        f"{host}/features",
+        params={"organism": "h_sapiens"},
+    ).json()["features"]
+
+    def post(_):
+        # Averages of every gene in every organ with this cell type
+        return requests.post(
+            f"{host}/average",
+            json={
+                "organism": "h_sapiens",
+                "celltype": "fibroblast",
+                "features": features,
+            },
+        )
+
+    with ThreadPoolExecutor(32) as pool:
+        responses = list(pool.map(post, range(32)))
+
+    assert {response.status_code for response in responses} <= {200, 429}
+    rejected = [response for response in responses if response.status_code == 429]
+    if not rejected:
+        pytest.skip("The server had enough workers to admit every request")
+
+    for response in rejected:
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json()["error"]["lane"] == "expensive"
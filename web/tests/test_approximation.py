@@ -0,0 +1,71 @@
+import pytest
+import requests
+
+
+def get_range(host, start, end, encoding="identity", if_range=None):
+    """Get a byte range of an approximation file, without decoding it."""
+    headers = {"Accept-Encoding": encoding, "Range": f"bytes={start}-{end}"}
+    if if_range is not None:
+        headers["If-Range"] = if_range
+    response = requests.get(
+        f"{host}/approximation",
+        params={"organism": "m_musculus"},
+        headers=headers,
+        stream=True,
+    )
+    if response.status_code == 206:
+        content = response.raw.read(decode_content=False)
+    else:
+        # Do not download the whole file
+        content = None
+    response.close()
+    return response, content
+
+
+def test_approximation_range(host):
+    response, first = get_range(host, 0, 99)
+    assert response.status_code == 206
+    assert len(first) == 100
+    # HDF5 signature
+    assert first[:8] == b"\x89HDF\r\n\x1a\n"
+    etag = response.headers["ETag"]
+
+    # Resuming with the right ETag gives the next part
+    response, second = get_range(host, 100, 199, if_range=etag)
+    assert response.status_code == 206
+    assert response.headers["Content-Range"].startswith("bytes 100-199/")
+    assert len(second) == 100
+
+    # ... and the same bytes as a single range
+    response, both = get_range(host, 0, 199)
+    assert both == first + second
+
+    # A changed file (i.e. another ETag) gives the whole file instead
+    response, _ = get_range(host, 100, 199, if_range='"outdated"')
+    assert response.status_code == 200
+    assert "Content-Range" not in response.headers
+
+
+def test_approximation_range_precompressed(host):
+    response, first = get_range(host, 0, 99, encoding="zstd, br, gzip")
+    if "Content-Encoding" not in response.headers:
+        pytest.skip("No precompressed copy of the approximation on the server")
+    assert response.status_code == 206
+    etag = response.headers["ETag"]
+
+    # Compressed and uncompressed files are different representations
+    response_identity, _ = get_range(host, 0, 99)
+    assert response_identity.headers["ETag"] != etag
+
+    # Ranges refer to the compressed bytes
+    response, second = get_range(host, 100, 199, encoding="zstd, br, gzip", if_range=etag)
+    assert response.status_code == 206
+    response, both = get_range(host, 0, 199, encoding="zstd, br, gzip")
+    assert both == first + second
+
+    # The uncompressed file's ETag does not resume a compressed download
+    response, _ = get_range(
+        host, 100, 199, encoding="zstd, br, gzip",
+        if_range=response_identity.headers["ETag"],
+    )
+    assert response.status_code == 200
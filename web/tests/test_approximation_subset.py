@@ -0,0 +1,102 @@
+import pytest
+import requests
+
+
+def test_approximation_subset(host):
+    response = requests.get(
+        f"{host}/approximation_subset",
+        params={
+            "organism": "h_sapiens",
+            "organs": "lung",
+            "celltypes": "macrophage,fibroblast",
+            "features": "CD68,COL1A1",
+        },
+    )
+
+    assert response.status_code == 200
+    # HDF5 signature
+    assert response.content[:8] == b"\x89HDF\r\n\x1a\n"
+
+
+def test_approximation_subset_content(host, tmp_path):
+    import h5py
+    # Averages are compressed with zstd
+    import hdf5plugin
+
+    params = {
+        "organism": "h_sapiens",
+        "organs": "lung",
+        "celltypes": "macrophage,fibroblast",
+        "features": "CD68,COL1A1",
+    }
+    response = requests.get(f"{host}/approximation_subset", params=params)
+    assert response.status_code == 200
+    path = tmp_path / "subset.h5"
+    path.write_bytes(response.content)
+
+    response = requests.get(
+        f"{host}/average",
+        params={"organism": "h_sapiens", "organ": "lung", "features": "CD68,COL1A1"},
+    )
+    expected = response.json()
+
+    with h5py.File(path, "r") as db:
+        assert list(db["measurements"].keys()) == ["gene_expression"]
+        group = db["measurements"]["gene_expression"]
+        features = list(group["var_names"].asstr()[:])
+        assert sorted(features) == ["CD68", "COL1A1"]
+
+        values = group["grouped_by"]["tissue->celltype"]["values"]
+        assert list(values["tissue"].asstr()[:]) == ["lung"]
+        assert sorted(values["celltype"].asstr()[:]) == ["fibroblast", "macrophage"]
+
+        data = group["data"]["tissue->celltype"]["lung"]
+        celltypes = list(data["obs_names"].asstr()[:])
+        assert sorted(celltypes) == ["fibroblast", "macrophage"]
+        average = data["average"][:]
+        if "quantisation" in group:
+            average = group["quantisation"][:][average]
+
+    # Same averages as from the API, which has features as rows
+    for i, feature in enumerate(features):
+        row = expected["average"][expected["features"].index(feature)]
+        for j, cell_type in enumerate(celltypes):
+            assert average[j, i] == pytest.approx(
+                row[expected["celltypes"].index(cell_type)], rel=1e-5,
+            )
+
+
+@pytest.mark.parametrize("param,value", [
+    ("organs", "notanorgan"),
+    ("celltypes", "notacelltype"),
+    ("features", "CD68,NOTAGENE"),
+])
+def test_approximation_subset_not_found(host, param, value):
+    params = {
+        "organism": "h_sapiens",
+        "organs": "lung",
+        "features": "CD68",
+    }
+    params[param] = value
+    response = requests.get(f"{host}/approximation_subset", params=params)
+
+    assert response.status_code == 400
+
+
+def test_approximation_subset_etag(host):
+    params = {
+        "organism": "h_sapiens",
+        "organs": "lung",
+        "features": "CD68,COL1A1",
+    }
+    response = requests.get(f"{host}/approximation_subset", params=params)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = requests.get(
+        f"{host}/approximation_subset",
+        params=params,
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
@@ -1,3 +1,4 @@
+import json
 import pytest
 import requests
 
@@ -26,3 +27,163 @@ def test_average(host):
     assert resp_content["features"] == ["COL1A1", "PTPRC"]
     assert len(resp_content["average"]) == 2
     assert len(resp_content["average"][0]) > 8
+
+
+def test_average_cached(host):
+    params = {
+        "organism": "h_sapiens",
+        "organ": "Lung",
+        "features": ",".join(["COL1A1", "PTPRC"]),
+    }
+    response = requests.get(f"{host}/average", params=params)
+
+    # Same query spelled differently
+    params["organ"] = "lung"
+    params["features"] = "col1a1, ptprc"
+    response_cached = requests.get(f"{host}/average", params=params)
+
+    assert response_cached.headers["X-Cache"] == "HIT"
+    assert response_cached.json() == response.json()
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_average_not_modified(host, encoding):
+    # Enough features for the body to be compressed, if the client accepts it
+    params = {
+        "organism": "h_sapiens",
+        "organ": "Lung",
+        "features": ",".join([
+            "COL1A1", "PTPRC", "CD68", "CD3E", "CD19", "EPCAM", "PECAM1", "ACTA2",
+            "MS4A1", "NKG7", "LYZ", "SFTPC", "KRT5", "VWF", "CDH5", "MKI67",
+            "TOP2A", "GAPDH", "ACTB", "VIM",
+        ]),
+    }
+    headers = {"Accept-Encoding": encoding}
+    response = requests.get(f"{host}/average", params=params, headers=headers)
+    assert response.headers.get("Content-Encoding", "identity") == encoding
+    etag = response.headers["ETag"]
+
+    response_cached = requests.get(
+        f"{host}/average",
+        params=params,
+        headers={"If-None-Match": etag, **headers},
+    )
+
+    assert response_cached.status_code == 304
+    assert response_cached.content == b""
+    # Same validator and representation headers as the 200
+    assert response_cached.headers["ETag"] == etag
+    assert response_cached.headers["Vary"] == response.headers["Vary"]
+
+
+def test_average_msgpack(host):
+    import msgpack
+
+    response = requests.get(
+        f"{host}/average",
+        params={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "features": ",".join(["COL1A1", "PTPRC"]),
+        },
+        headers={"Accept": "application/msgpack"},
+    )
+    assert response.headers["Content-Type"] == "application/msgpack"
+
+    resp_content = msgpack.unpackb(response.content)
+    assert resp_content["features"] == ["COL1A1", "PTPRC"]
+    # Numeric arrays are sent as raw buffers in an extension type
+    assert resp_content["average"].code == 1
+
+
+def test_average_post_stream(host):
+    response = requests.post(
+        f"{host}/average",
+        json={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "features": ["COL1A1", "PTPRC"],
+        },
+    )
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.iter_lines()]
+    assert lines[0]["organ"] == "lung"
+    assert sorted(line["feature"] for line in lines[1:]) == ["COL1A1", "PTPRC"]
+    assert len(lines[1]["average"]) == len(lines[0]["celltypes"])
+
+
+def test_average_region(host):
+    response = requests.get(
+        f"{host}/average",
+        params={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "measurement_type": "chromatin_accessibility",
+            "region": "chr1:1000000-1100000",
+        },
+    )
+    resp_content = response.json()
+
+    assert response.status_code == 200
+    assert resp_content["region"] == "chr1:1000000-1100000"
+    assert len(resp_content["features"]) > 0
+    assert all(fea.startswith("chr1") for fea in resp_content["features"])
+    assert len(resp_content["average"]) == len(resp_content["features"])
+
+
+def test_average_region_gene_expression(host):
+    response = requests.get(
+        f"{host}/average",
+        params={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "region": "chr1:1000000-1100000",
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json()["error"]["invalid_parameter"] == "region"
+
+
+@pytest.mark.parametrize("region", ["chr1:2000-1000", "chr1:1000", "chr1:abc-2000"])
+def test_average_region_invalid(host, region):
+    response = requests.get(
+        f"{host}/average",
+        params={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "measurement_type": "chromatin_accessibility",
+            "region": region,
+        },
+    )
+    assert response.status_code == 400
+    error = response.json()["error"]
+    assert error["invalid_parameter"] == "region"
+    assert error["invalid_value"] == region
+
+
+def test_average_coalesced(host):
+    """Identical concurrent requests are computed once (single server process)."""
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    # A feature order nobody asked for yet, so the response is not cached
+    features = ["COL1A1", "PTPRC", "CD4", "CD8A", "EPCAM", "CDH5", "ACTA2", "MS4A1"]
+    random.shuffle(features)
+    params = {
+        "organism": "h_sapiens",
+        "organ": "Lung",
+        "features": ",".join(features),
+    }
+
+    def get(_):
+        return requests.get(f"{host}/average", params=params)
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(get, range(8)))
+
+    statuses = [response.headers["X-Cache"] for response in responses]
+    assert statuses.count("MISS") == 1
+    assert set(statuses) <= {"MISS", "COALESCED", "HIT"}
+    assert all(response.json() == responses[0].json() for response in responses)
@@ -0,0 +1,43 @@
+import pytest
+import requests
+
+
+def test_batch(host):
+    response = requests.post(
+        f"{host}/batch",
+        json={
+            "queries": [
+                {
+                    "endpoint": "celltypes",
+                    "params": {"organism": "h_sapiens", "organ": "Lung"},
+                },
+                {
+                    "endpoint": "average",
+                    "params": {
+                        "organism": "m_musculus",
+                        "organ": "Lung",
+                        "features": ["Col1a1", "Ptprc"],
+                    },
+                },
+                {
+                    "endpoint": "organs",
+                    "params": {"organism": "nonexisting"},
+                },
+            ],
+        },
+    )
+    assert response.ok
+
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[0]["status"] == 200
+    assert results[0]["result"]["organ"] == "lung"
+    assert results[1]["status"] == 200
+    assert results[1]["result"]["features"] == ["Col1a1", "Ptprc"]
+    assert results[2]["status"] == 400
+    assert results[2]["error"]["invalid_parameter"] == "organism"
+
+
+def test_batch_no_queries(host):
+    response = requests.post(f"{host}/batch", json={})
+    assert response.status_code == 400
@@ -0,0 +1,47 @@
+import pytest
+import requests
+
+
+def test_celltypexorganism(host):
+    response = requests.get(f"{host}/celltypexorganism")
+    resp_content = response.json()
+
+    assert "h_sapiens" in resp_content["organisms"]
+    assert "fibroblast" in resp_content["celltypes"]
+    assert len(resp_content["detected"]) == len(resp_content["celltypes"])
+    assert all(len(row) == len(resp_content["organisms"]) for row in resp_content["detected"])
+
+
+def test_celltypexorganism_matches_celltypexorgan(host):
+    """The cross-organism matrix agrees with each organism's own matrix."""
+    response = requests.get(f"{host}/celltypexorganism")
+    resp_content = response.json()
+    idx_organism = resp_content["organisms"].index("h_sapiens")
+    celltypes_detected = {
+        celltype
+        for celltype, row in zip(resp_content["celltypes"], resp_content["detected"])
+        if row[idx_organism]
+    }
+
+    response = requests.get(
+        f"{host}/celltypexorgan",
+        params={"organism": "h_sapiens"},
+    )
+    resp_organism = response.json()
+    celltypes_organism = {
+        celltype
+        for celltype, row in zip(resp_organism["celltypes"], resp_organism["detected"])
+        if any(row)
+    }
+
+    assert celltypes_detected == celltypes_organism
+
+
+def test_celltypexorganism_cached(host):
+    # Depends on all atlases, so it is versioned by their combined content hash
+    response = requests.get(f"{host}/celltypexorganism")
+    response_cached = requests.get(f"{host}/celltypexorganism")
+
+    assert response_cached.headers["X-Cache"] == "HIT"
+    assert response_cached.headers["ETag"] == response.headers["ETag"]
+    assert response_cached.json() == response.json()
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+
+
+def test_concurrent_requests(host):
+    """Concurrent requests on different organisms and endpoints all succeed."""
+    queries = [
+        ("average", {"organism": "h_sapiens", "organ": "Lung", "features": "COL1A1,PTPRC"}),
+        ("average", {"organism": "m_musculus", "organ": "Lung", "features": "Col1a1,Ptprc"}),
+        ("celltypes", {"organism": "h_sapiens", "organ": "Lung"}),
+        ("features", {"organism": "m_musculus"}),
+        ("celltypexorganism", {}),
+    ] * 4
+
+    def get(query):
+        endpoint, params = query
+        response = requests.get(f"{host}/{endpoint}", params=params)
+        return response.status_code, response.json()
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(get, queries))
+
+    assert [status for status, _ in results] == [200] * len(queries)
+    # The same query gives the same answer regardless of which worker served it
+    nqueries = len(queries) // 4
+    for i, (_, content) in enumerate(results):
+        assert content == results[i % nqueries][1]
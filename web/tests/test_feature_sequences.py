@@ -0,0 +1,48 @@
+import json
+import pytest
+import requests
+
+
+def test_feature_sequences(host):
+    response = requests.get(
+        f"{host}/sequences",
+        params={"organism": "h_sapiens", "features": "CD4,col1a1"},
+    )
+    resp_content = response.json()
+
+    assert resp_content["organism"] == "h_sapiens"
+    assert resp_content["features"] == ["CD4", "COL1A1"]
+    assert len(resp_content["sequences"]) == 2
+    assert resp_content["type"] == "protein"
+
+
+def test_feature_sequences_fasta(host):
+    params = {"organism": "h_sapiens", "features": "CD4,COL1A1"}
+    response_json = requests.get(f"{host}/sequences", params=params)
+    params["format"] = "fasta"
+    response = requests.get(f"{host}/sequences", params=params)
+
+    assert response.headers["Content-Type"].startswith("text/x-fasta")
+    lines = response.text.strip().split("\n")
+    assert lines[0::2] == [">CD4", ">COL1A1"]
+    assert lines[1::2] == response_json.json()["sequences"]
+
+
+def test_feature_sequences_ndjson(host):
+    response = requests.get(
+        f"{host}/sequences",
+        params={"organism": "h_sapiens", "features": "CD4,COL1A1", "format": "ndjson"},
+    )
+
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.iter_lines()]
+    assert [line["feature"] for line in lines] == ["CD4", "COL1A1"]
+    assert all(line["type"] == "protein" for line in lines)
+
+
+def test_feature_sequences_invalid_format(host):
+    response = requests.get(
+        f"{host}/sequences",
+        params={"organism": "h_sapiens", "features": "CD4", "format": "xml"},
+    )
+    assert response.status_code == 400
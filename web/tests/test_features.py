@@ -12,3 +12,40 @@ def test_features(host):
     assert list(resp_content.keys()) == ["organism", "features"]
     assert resp_content["organism"] == "h_sapiens"
     assert len(resp_content["features"]) > 10000
+
+
+def test_features_paginated(host):
+    response = requests.get(
+        f"{host}/features",
+        params={"organism": "h_sapiens", "offset": 10, "limit": 5},
+    )
+    resp_content = response.json()
+
+    assert resp_content["offset"] == 10
+    assert resp_content["next_offset"] == 15
+    assert len(resp_content["features"]) == 5
+    assert resp_content["total"] > 10000
+
+
+def test_features_compressed(host):
+    params = {"organism": "h_sapiens"}
+    response_plain = requests.get(
+        f"{host}/features",
+        params=params,
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert "Content-Encoding" not in response_plain.headers
+
+    # Ask twice, so the second response comes from the cache of compressed bodies
+    for _ in range(2):
+        response = requests.get(
+            f"{host}/features",
+            params=params,
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        # Compressed representations carry a weak version of the same ETag
+        assert response.headers["ETag"] == "W/" + response_plain.headers["ETag"]
+        # requests decompresses transparently
+        assert response.json() == response_plain.json()
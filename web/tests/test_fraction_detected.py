@@ -1,3 +1,4 @@
+import json
 import pytest
 import requests
 
@@ -26,3 +27,21 @@ def test_fraction_detected(host):
     assert resp_content["features"] == ["COL1A1", "PTPRC"]
     assert len(resp_content["fraction_detected"]) == 2
     assert len(resp_content["fraction_detected"][0]) > 8
+
+
+def test_fraction_detected_post_region(host):
+    response = requests.post(
+        f"{host}/fraction_detected",
+        json={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "measurement_type": "chromatin_accessibility",
+            "region": "chr1:1000000-1100000",
+        },
+    )
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.iter_lines()]
+    assert lines[0]["region"] == "chr1:1000000-1100000"
+    assert len(lines) > 1
+    assert all(line["feature"].startswith("chr1") for line in lines[1:])
@@ -0,0 +1,68 @@
+import pytest
+import requests
+
+
+def test_homologs(host):
+    response = requests.get(
+        f"{host}/homologs",
+        params={
+            "source_organism": "h_sapiens",
+            "target_organism": "m_musculus",
+            "features": "CD4,COL1A1",
+        },
+    )
+    resp_content = response.json()
+
+    assert sorted(set(resp_content["queries"])) == ["CD4", "COL1A1"]
+    assert len(resp_content["targets"]) == len(resp_content["queries"])
+    assert len(resp_content["distances"]) == len(resp_content["queries"])
+    assert "target_organisms" not in resp_content
+
+
+def test_homologs_all(host):
+    response = requests.get(
+        f"{host}/homologs",
+        params={
+            "source_organism": "h_sapiens",
+            "target_organism": "all",
+            "features": "CD4,COL1A1",
+        },
+    )
+    resp_content = response.json()
+
+    assert len(resp_content["target_organisms"]) == len(resp_content["queries"])
+    assert "m_musculus" in resp_content["target_organisms"]
+    # The query organism itself is never searched
+    assert "h_sapiens" not in resp_content["target_organisms"]
+    assert len(resp_content["targets"]) == len(resp_content["queries"])
+
+
+def test_homologs_all_concurrent(host):
+    """Concurrent first requests must all see the fully loaded embedding index."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def get(_):
+        return requests.get(
+            f"{host}/homologs",
+            params={
+                "source_organism": "m_musculus",
+                "target_organism": "all",
+                "features": "Cd4",
+            },
+        ).status_code
+
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(pool.map(get, range(8)))
+    assert statuses == [200] * 8
+
+
+def test_homologs_nonexisting_organism(host):
+    response = requests.get(
+        f"{host}/homologs",
+        params={
+            "source_organism": "nonexisting",
+            "target_organism": "all",
+            "features": "CD4",
+        },
+    )
+    assert response.status_code == 400
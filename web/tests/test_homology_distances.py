@@ -0,0 +1,21 @@
+import pytest
+import requests
+
+
+def test_homology_distances(host):
+    response = requests.get(
+        f"{host}/homology_distances",
+        params={
+            "source_organism": "h_sapiens",
+            "target_organism": "m_musculus",
+            "source_features": "CD4,COL1A1",
+            "target_features": "Cd4,Col1a1",
+        },
+    )
+    resp_content = response.json()
+
+    assert resp_content["queries"] == ["CD4", "COL1A1"]
+    assert resp_content["targets"] == ["Cd4", "Col1a1"]
+    assert len(resp_content["distances"]) == 2
+    assert all(dis >= 0 for dis in resp_content["distances"])
+
@@ -0,0 +1,79 @@
+import pytest
+import requests
+
+
+def test_interaction_partners(host):
+    response = requests.get(
+        f"{host}/interaction_partners",
+        params={
+            "organism": "h_sapiens",
+            "features": "CD4,CD8A",
+        },
+    )
+    resp_content = response.json()
+
+    assert len(resp_content["queries"]) == len(resp_content["targets"])
+    assert len(resp_content["queries"]) > 0
+    assert set(resp_content["queries"]) <= {"CD4", "CD8A"}
+    # Interactions are symmetric, so each partner is reported once per query
+    pairs = list(zip(resp_content["queries"], resp_content["targets"]))
+    assert len(pairs) == len(set(pairs))
+
+
+def test_interaction_partners_depth_one_uncapped(host):
+    params = {"organism": "h_sapiens", "features": "CD4,CD8A"}
+    response = requests.get(f"{host}/interaction_partners", params=params)
+    # A max_nodes cap larger than any neighbourhood changes nothing
+    params["max_nodes"] = 1000000
+    response_large = requests.get(f"{host}/interaction_partners", params=params)
+    resp_content = response.json()
+
+    assert "depths" not in resp_content
+    assert resp_content == response_large.json()
+
+
+def test_interaction_partners_depth(host):
+    params = {"organism": "h_sapiens", "features": "CD4"}
+    response = requests.get(f"{host}/interaction_partners", params=params)
+    direct = set(response.json()["targets"])
+
+    params["depth"] = 2
+    response = requests.get(f"{host}/interaction_partners", params=params)
+    resp_content = response.json()
+
+    assert len(resp_content["depths"]) == len(resp_content["targets"])
+    assert set(resp_content["depths"]) <= {1, 2}
+    targets_depth1 = {
+        target for target, depth in zip(resp_content["targets"], resp_content["depths"])
+        if depth == 1
+    }
+    assert targets_depth1 == direct
+    # Second-hop edges start from direct partners
+    for query, depth in zip(resp_content["queries"], resp_content["depths"]):
+        if depth == 2:
+            assert query in direct
+
+
+def test_interaction_partners_max_nodes(host):
+    response = requests.get(
+        f"{host}/interaction_partners",
+        params={
+            "organism": "h_sapiens",
+            "features": "CD4",
+            "depth": 3,
+            "max_nodes": 5,
+        },
+    )
+    resp_content = response.json()
+
+    # The neighbourhood includes the queried feature
+    nodes = set(resp_content["targets"]) | {"CD4"}
+    assert len(nodes) <= 5
+
+
+def test_interaction_partners_invalid_depth(host):
+    response = requests.get(
+        f"{host}/interaction_partners",
+        params={"organism": "h_sapiens", "features": "CD4", "depth": 6},
+    )
+    assert response.status_code == 400
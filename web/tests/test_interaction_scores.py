@@ -0,0 +1,20 @@
+import pytest
+import requests
+
+
+def test_interaction_scores(host):
+    response = requests.get(
+        f"{host}/interaction_scores",
+        params={
+            "organism": "h_sapiens",
+            "organ": "Lung",
+            "number": 10,
+        },
+    )
+    resp_content = response.json()
+
+    assert resp_content["organism"] == "h_sapiens"
+    assert len(resp_content["scores"]) == 10
+    assert len(resp_content["sources"]) == 10
+    assert len(resp_content["target_celltypes"]) == 10
+    assert resp_content["scores"] == sorted(resp_content["scores"], reverse=True)
@@ -21,3 +21,34 @@ def test_markers(host):
     assert resp_content["celltype"] == "fibroblast"
     # FIXME: THESE ARE MARKERS FOR ASM, CHECK THE DATA
     assert resp_content["markers"] == ["Hhip", "Aspn", "Grem2"]
+
+
+def test_markers_autocorrect(host):
+    params = {
+        "organism": "m_musculus",
+        "organ": "Lung",
+        "celltype": "fibroblast",
+        "number": 3,
+    }
+    response = requests.get(f"{host}/markers", params=params)
+
+    # Typos, including characters absent from every cell type, are corrected
+    for typo in ["fibroblastt", "fibröblast"]:
+        params["celltype"] = typo
+        response_typo = requests.get(f"{host}/markers", params=params)
+        assert response_typo.status_code == 200
+        assert response_typo.json()["celltype"] == "fibroblast"
+        assert response_typo.json()["markers"] == response.json()["markers"]
+
+
+def test_markers_celltype_not_found(host):
+    response = requests.get(
+        f"{host}/markers",
+        params={
+            "organism": "m_musculus",
+            "organ": "Lung",
+            "celltype": "zzzzzzzzzzzz",
+            "number": 3,
+        },
+    )
+    assert response.status_code == 400
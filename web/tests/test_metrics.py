@@ -0,0 +1,22 @@
+import pytest
+import requests
+
+
+def test_metrics(host):
+    requests.get(f"{host}/organisms")
+
+    # Metrics are served at the root, outside of the API version
+    response = requests.get(host.rsplit("/", 1)[0] + "/metrics")
+    if response.status_code == 404:
+        pytest.skip("Metrics are not enabled in the configuration.")
+    if response.status_code == 401:
+        pytest.skip("Metrics require a token.")
+
+    assert response.headers["Content-Type"].startswith("text/plain")
+    lines = response.text.split("\n")
+    assert any(
+        line.startswith("atlasapprox_request_duration_seconds_count")
+        and 'endpoint="/v1/organisms"' in line
+        for line in lines
+    )
+    assert any(line.startswith("atlasapprox_hdf5_opens_total") for line in lines)
@@ -0,0 +1,28 @@
+import pytest
+import requests
+
+
+def test_organxorganism(host):
+    response = requests.get(
+        f"{host}/organxorganism",
+        params={"celltype": "fibroblast"},
+    )
+    resp_content = response.json()
+
+    assert resp_content["celltype"] == "fibroblast"
+    assert "h_sapiens" in resp_content["organisms"]
+    assert len(resp_content["detected"]) == len(resp_content["organs"])
+    assert all(len(row) == len(resp_content["organisms"]) for row in resp_content["detected"])
+    # Fibroblasts are found in the human lung
+    idx_organ = resp_content["organs"].index("lung")
+    idx_organism = resp_content["organisms"].index("h_sapiens")
+    assert resp_content["detected"][idx_organ][idx_organism]
+
+
+def test_organxorganism_celltype_not_found(host):
+    response = requests.get(
+        f"{host}/organxorganism",
+        params={"celltype": "nonexisting"},
+    )
+    assert response.status_code == 400
+    assert response.json()["error"]["invalid_parameter"] == "celltype"
@@ -0,0 +1,46 @@
+import os
+import pytest
+import requests
+
+
+params = {
+    "organism": "h_sapiens",
+    "organ": "Lung",
+    "features": "COL1A1,PTPRC",
+}
+
+
+def test_profiling_wrong_token(host):
+    response = requests.get(
+        f"{host}/average",
+        params=params,
+        headers={"X-Profile": "not-the-token"},
+    )
+    resp_content = response.json()
+
+    # Answered as usual, without any profile
+    assert response.status_code == 200
+    assert resp_content["features"] == ["COL1A1", "PTPRC"]
+    assert "breakdown" not in resp_content
+
+
+def test_profiling(host):
+    # The token of the server under test, if profiling is enabled there
+    token = os.getenv("ATLASAPPROX_PROFILE_TOKEN", None)
+    if not token:
+        pytest.skip("Set ATLASAPPROX_PROFILE_TOKEN to the token configured on the server.")
+
+    response = requests.get(
+        f"{host}/average",
+        params=params,
+        headers={"X-Profile": token},
+    )
+    resp_content = response.json()
+
+    assert resp_content["status"] == 200
+    assert resp_content["path"].startswith("/v1/average")
+    assert set(resp_content["breakdown"]) == {
+        "hdf5", "dequantisation", "pandas", "serialisation", "other",
+    }
+    assert resp_content["wall_time"] > 0
+    assert len(resp_content["top"]) > 0
@@ -0,0 +1,18 @@
+import pytest
+import requests
+
+
+def test_search_features(host):
+    response = requests.get(
+        f"{host}/search_features",
+        params={
+            "organism": "h_sapiens",
+            "query": "col1a",
+            "number": 5,
+        },
+    )
+    resp_content = response.json()
+
+    assert resp_content["organism"] == "h_sapiens"
+    assert resp_content["features"][:2] == ["COL1A1", "COL1A2"]
+    assert resp_content["match"][0] == "prefix"
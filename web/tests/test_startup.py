@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+
+
+def test_first_requests_concurrent(host):
+    """Requests needing different lazily imported dependencies work when sent at once.
+
+    On a server started with PRELOAD_CACHES=0 these are the first uses of numpy, pandas,
+    scipy, h5py, hdf5plugin, msgpack and levenshtein_finder in each worker.
+    """
+    queries = [
+        ("organisms", {}, {}),
+        ("average", {"organism": "h_sapiens", "organ": "Lung", "features": "COL1A1,PTPRC"},
+         {"Accept": "application/msgpack"}),
+        ("celltypexorganism", {}, {}),
+        ("markers", {"organism": "m_musculus", "organ": "Lung", "celltype": "fibroblastt",
+                     "number": 3}, {}),
+        ("similar_features", {"organism": "m_musculus", "organ": "Lung", "feature": "Col1a1",
+                              "method": "correlation", "number": 3}, {}),
+    ]
+
+    def get(query):
+        endpoint, params, headers = query
+        response = requests.get(f"{host}/{endpoint}", params=params, headers=headers)
+        return response.status_code, response.content
+
+    with ThreadPoolExecutor(len(queries)) as pool:
+        results = list(pool.map(get, queries))
+
+    assert [status for status, _ in results] == [200] * len(queries)
+    # Once everything is imported, the same requests give the same answers
+    assert [get(query) for query in queries] == results